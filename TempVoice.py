@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-import aiosqlite
 
 class RenameModal(discord.ui.Modal, title="Kanal umbenennen"):
     def __init__(self, voice_channel: discord.VoiceChannel):
@@ -104,22 +103,21 @@ class TempVoice(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db_path = 'TempVoice.db'
+        # Dauerhafte Verbindung aus dem Storage-Service des Bots (siehe storage.py)
+        self.db = bot.storage.database(self.db_path)
         self.temp_channels_data = {}
 
     async def init_db(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS tempvoice (
-                                                         guild_id INTEGER PRIMARY KEY,
-                                                         channel_id INTEGER NOT NULL
-                )
-                """
-            )
-            await db.commit()
-
-    @commands.Cog.listener()
-    async def on_ready(self):
+        await self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tempvoice (
+                                                     guild_id INTEGER PRIMARY KEY,
+                                                     channel_id INTEGER NOT NULL
+            );
+            """
+        )
+
+    async def cog_load(self):
         await self.init_db()
 
     @discord.app_commands.command(
@@ -138,12 +136,10 @@ class TempVoice(commands.Cog):
             tempvoicechannel_id = channel.id
 
             try:
-                async with aiosqlite.connect(self.db_path) as db:
-                    await db.execute(
-                        "INSERT OR REPLACE INTO tempvoice (guild_id, channel_id) VALUES (?, ?)",
-                        (guild_id, tempvoicechannel_id)
-                    )
-                    await db.commit()
+                await self.db.execute(
+                    "INSERT OR REPLACE INTO tempvoice (guild_id, channel_id) VALUES (?, ?)",
+                    (guild_id, tempvoicechannel_id)
+                )
 
                 category = discord.utils.get(guild.categories, name='TempVoices')
                 if not category:
@@ -169,9 +165,7 @@ class TempVoice(commands.Cog):
 
         if after.channel is not None and before.channel != after.channel:
             try:
-                async with aiosqlite.connect(self.db_path) as db:
-                    cursor = await db.execute("SELECT channel_id FROM tempvoice WHERE guild_id = ?", (guild.id,))
-                    row = await cursor.fetchone()
+                row = await self.db.fetchone("SELECT channel_id FROM tempvoice WHERE guild_id = ?", (guild.id,))
 
                 if row and after.channel.id == row[0]:
                     category = discord.utils.get(guild.categories, name='TempVoices')
@@ -2,9 +2,17 @@ import discord
 import discord.app_commands
 from discord import app_commands
 from discord.ext import commands
-import aiosqlite
 import asyncio
-
+import os
+import time
+from ticket_archive import TicketArchiver
+from ticket_stats import TicketStats
+from ticket_autoclose import DeadlineScheduler
+from ratelimit import RateLimitedQueue
+from ticket_types import TicketTypeRegistry
+from ticket_assign import StaffLoadBalancer
+
+# Zugriff pro Ticket-Typ (konfiguriert in ticket_types.json):
 # Bewerbung: Admin
 # Allgemein: ab Supporter
 # Nutzermeldung: ab Mods
@@ -40,26 +48,196 @@ GENERAL_SUPPORT_ROLE_ID = supporter_role_id
 MOD_TEAM_ROLE_ID = mod_role_id
 
 TICKETS_DB = 'tickets.db'
+
+# Ticket-Typen (Texte, Rollen mit Zugriff) stehen in dieser Datei; neue Typen brauchen keine Codeänderung
+TICKET_TYPES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ticket_types.json')
+ROLE_TIERS = {
+    'supporter': supporter_role_id,
+    'mod': mod_role_id,
+    'admin': administrator_role_id,
+}
+
+# Offene/geclaimte Tickets ohne neue Nachricht werden nach dieser Zeit automatisch geschlossen (Sekunden)
+TICKET_INACTIVITY_TIMEOUT = 72 * 60 * 60
 # ------------------------------
 
-async def init_db():
-    async with aiosqlite.connect(TICKETS_DB) as db:
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS tickets (
-                                                   channel_id INTEGER PRIMARY KEY,
-                                                   user_id INTEGER NOT NULL,
-                                                   status TEXT NOT NULL,
-                                                   claimed_by INTEGER
-            )
-            """
+TICKET_TYPES = TicketTypeRegistry.load(TICKET_TYPES_FILE, ROLE_TIERS, always_allowed_role_ids=[ALL_TICKETS_ACCESS_ROLE_ID])
+
+def tickets_db(client):
+    # Die Verbindung gehört dem Bot (siehe storage.py) und bleibt dauerhaft offen
+    return client.storage.database(TICKETS_DB)
+
+async def init_db(db):
+    await db.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS tickets (
+                                               channel_id INTEGER PRIMARY KEY,
+                                               user_id INTEGER NOT NULL,
+                                               status TEXT NOT NULL,
+                                               claimed_by INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_tickets_user_status ON tickets (user_id, status);
+        CREATE TABLE IF NOT EXISTS ticket_settings (
+                                                       key TEXT PRIMARY KEY,
+                                                       value TEXT
+        );
+        """
+    )
+    await db.add_missing_columns('tickets', {
+        'archive_path': 'TEXT',
+        'ticket_type': 'TEXT',
+        'created_at': 'REAL',
+        'claimed_at': 'REAL',
+        'first_claimed_by': 'INTEGER',
+        'first_staff_reply_at': 'REAL',
+        'closed_at': 'REAL',
+        'closed_by': 'INTEGER',
+    })
+    # Covering-Index für den Aufbau der Statistik beim Start (enthält alle TicketStore.STATS_COLUMNS)
+    await db.executescript(
+        "CREATE INDEX IF NOT EXISTS idx_tickets_stats ON tickets (created_at, ticket_type, claimed_at, first_claimed_by, closed_at, closed_by);"
+    )
+
+
+class TicketStore:
+    """Write-Through-Cache der tickets-Tabelle: gelesen wird nur aus dem Speicher, geschrieben auch auf die Platte.
+
+    Gelöschte Tickets (status 'deleted') bleiben mit ihrem Archivpfad in der Tabelle, aber nicht im Cache.
+    """
+
+    COLUMNS = (
+        'user_id', 'status', 'claimed_by', 'archive_path', 'ticket_type', 'created_at',
+        'claimed_at', 'first_claimed_by', 'first_staff_reply_at', 'closed_at', 'closed_by'
+    )
+    STATS_COLUMNS = ('ticket_type', 'created_at', 'claimed_at', 'first_claimed_by', 'closed_at', 'closed_by')
+
+    def __init__(self, db):
+        self.db = db
+        self.by_channel = {}
+        self.by_user = {}
+        self.by_status = {}
+        self.stats = TicketStats()
+        # Anzahl geclaimter, noch offener Tickets pro Teammitglied (für die automatische Zuweisung)
+        self.loads = StaffLoadBalancer()
+
+    async def load(self):
+        rows = await self.db.fetchall(f"SELECT channel_id, {', '.join(self.COLUMNS)} FROM tickets WHERE status != 'deleted'")
+        self.by_channel.clear()
+        self.by_user.clear()
+        self.by_status.clear()
+        self.loads.loads.clear()
+        for row in rows:
+            ticket = dict(zip(('channel_id',) + self.COLUMNS, row))
+            self._index(ticket)
+
+        # Die Statistik umfasst auch gelöschte Tickets; danach wird sie nur noch inkrementell gepflegt
+        self.stats.clear()
+        for row in await self.db.fetchall(f"SELECT {', '.join(self.STATS_COLUMNS)} FROM tickets WHERE created_at IS NOT NULL"):
+            self.stats.record(dict(zip(self.STATS_COLUMNS, row)))
+        print(f"✅ {len(self.by_channel)} Tickets in den Cache geladen.")
+
+    def _index(self, ticket):
+        channel_id = ticket['channel_id']
+        self.by_channel[channel_id] = ticket
+        self.by_user.setdefault(ticket['user_id'], set()).add(channel_id)
+        self.by_status.setdefault(ticket['status'], set()).add(channel_id)
+        if ticket['claimed_by'] and ticket['status'] in ('open', 'claimed'):
+            self.loads.change(ticket['claimed_by'], 1)
+
+    def _unindex(self, ticket):
+        channel_id = ticket['channel_id']
+        self.by_channel.pop(channel_id, None)
+        user_tickets = self.by_user.get(ticket['user_id'])
+        if user_tickets is not None:
+            user_tickets.discard(channel_id)
+            if not user_tickets:
+                del self.by_user[ticket['user_id']]
+        self.by_status.get(ticket['status'], set()).discard(channel_id)
+        if ticket['claimed_by'] and ticket['status'] in ('open', 'claimed'):
+            self.loads.change(ticket['claimed_by'], -1)
+
+    def get(self, channel_id):
+        return self.by_channel.get(channel_id)
+
+    def with_status(self, *statuses):
+        return [self.by_channel[channel_id] for status in statuses for channel_id in self.by_status.get(status, ())]
+
+    def open_ticket_of(self, user_id):
+        for channel_id in self.by_user.get(user_id, ()):
+            ticket = self.by_channel[channel_id]
+            if ticket['status'] in ('open', 'claimed'):
+                return ticket
+        return None
+
+    async def create(self, channel_id, user_id, ticket_type=None, status='open', claimed_by=None):
+        created_at = time.time()
+        # Automatische Zuweisung ist kein Claim: claimed_at/first_claimed_by bleiben leer, damit die Statistik nur echte Claims misst
+        await self.db.execute(
+            "INSERT INTO tickets (channel_id, user_id, status, ticket_type, created_at, claimed_by) VALUES (?, ?, ?, ?, ?, ?)",
+            (channel_id, user_id, status, ticket_type, created_at, claimed_by)
+        )
+        ticket = dict.fromkeys(self.COLUMNS)
+        ticket.update(
+            channel_id=channel_id, user_id=user_id, status=status, ticket_type=ticket_type, created_at=created_at,
+            claimed_by=claimed_by
+        )
+        self._index(ticket)
+        self.stats.record(ticket)
+        return ticket
+
+    async def update(self, channel_id, **fields):
+        unknown = set(fields) - set(self.COLUMNS)
+        if unknown:
+            raise ValueError(f"Unbekannte Ticket-Spalten: {', '.join(sorted(unknown))}")
+
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        await self.db.execute(
+            f"UPDATE tickets SET {assignments} WHERE channel_id = ?",
+            (*fields.values(), channel_id)
         )
-        await db.commit()
 
-async def get_ticket_data(channel_id):
-    async with aiosqlite.connect(TICKETS_DB) as db:
-        async with db.execute("SELECT user_id, status, claimed_by FROM tickets WHERE channel_id = ?", (channel_id,)) as cursor:
-            return await cursor.fetchone()
+        ticket = self.by_channel.get(channel_id)
+        if ticket is not None:
+            self._unindex(ticket)
+            self.stats.record(ticket, -1)
+            ticket.update(fields)
+            self.stats.record(ticket)
+            if ticket['status'] != 'deleted':
+                self._index(ticket)
+        return ticket
+
+    async def mark_deleted(self, archive_paths):
+        """Markiert mehrere Tickets (channel_id -> Archivpfad) in einer einzigen Transaktion als gelöscht."""
+        if not archive_paths:
+            return
+        await self.db.executemany(
+            "UPDATE tickets SET status = 'deleted', claimed_by = NULL, archive_path = ? WHERE channel_id = ?",
+            [(path, channel_id) for channel_id, path in archive_paths.items()]
+        )
+        for channel_id, path in archive_paths.items():
+            ticket = self.by_channel.get(channel_id)
+            if ticket is not None:
+                self._unindex(ticket)
+                ticket.update(status='deleted', claimed_by=None, archive_path=path)
+
+    async def delete(self, channel_id):
+        await self.db.execute("DELETE FROM tickets WHERE channel_id = ?", (channel_id,))
+        ticket = self.by_channel.get(channel_id)
+        if ticket is not None:
+            self._unindex(ticket)
+            self.stats.record(ticket, -1)
+        return ticket
+
+
+def ticket_store(client) -> TicketStore:
+    return client.get_cog('TicketCog').store
+
+async def archive_and_delete_record(store: TicketStore, channel_id: int, archive_path: str):
+    """Markiert das Ticket als gelöscht; die Zeile bleibt mit dem Pfad zum Transkript erhalten."""
+    if store.get(channel_id):
+        await store.update(channel_id, status='deleted', claimed_by=None, archive_path=archive_path)
+    else:
+        await store.delete(channel_id)
 
 async def move_ticket_category(channel: discord.TextChannel, status: str, claimed_by_id: int = None):
     category_id = None
@@ -76,20 +254,95 @@ async def move_ticket_category(channel: discord.TextChannel, status: str, claime
             await channel.edit(category=category)
 
 
+# Rollen, die immer Zugriff haben sollen (für die Bereinigungslogik beim Öffnen/Schließen)
+TEAM_ROLE_IDS = {supporter_role_id, mod_role_id, administrator_role_id, ALL_TICKETS_ACCESS_ROLE_ID}
+
+# Referenzen auf laufende Hintergrund-Tasks, damit sie nicht vom GC eingesammelt werden
+_background_tasks = set()
+
+def run_in_background(coro, description: str):
+    async def runner():
+        try:
+            await coro
+        except Exception as e:
+            print(f"❌ Fehler bei '{description}': {e}")
+
+    task = asyncio.create_task(runner())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+def build_ticket_overwrites(channel: discord.TextChannel, ticket, can_write: bool):
+    """Berechnet die kompletten Overwrites für ein geöffnetes bzw. geschlossenes Ticket im Speicher."""
+    me_id = channel.guild.me.id
+    creator = channel.guild.get_member(ticket['user_id']) if ticket else None
+    overwrites = channel.overwrites
+
+    for target, permissions in list(overwrites.items()):
+        is_team_or_bot = (isinstance(target, discord.Role) and target.id in TEAM_ROLE_IDS) or target.id == me_id
+        # Der Ersteller wird nur übersprungen, wenn er unten neu gesetzt wird (hat er den Server verlassen, gilt die Schleife)
+        if is_team_or_bot or (creator and target.id == creator.id):
+            continue
+
+        # Beim Schließen verlieren alle Schreibrechte, beim Öffnen bekommen alle Leser sie zurück
+        affected = permissions.read_messages if can_write else permissions.send_messages
+        if affected:
+            overwrites[target] = discord.PermissionOverwrite(
+                send_messages=can_write,
+                read_messages=True,
+                read_message_history=True
+            )
+
+    if creator:
+        overwrites[creator] = discord.PermissionOverwrite(
+            send_messages=can_write,
+            read_messages=True,
+            read_message_history=True
+        )
+
+    return overwrites
+
+async def apply_ticket_state(channel: discord.TextChannel, store: TicketStore, status: str, **fields):
+    """Schreibt den neuen Status und setzt Overwrites und Kategorie in einem einzigen channel.edit."""
+    ticket = store.get(channel.id)
+    overwrites = build_ticket_overwrites(channel, ticket, can_write=status != 'closed')
+    category_id = CLOSED_CATEGORY_ID if status == 'closed' else OPEN_CATEGORY_ID
+
+    edit_kwargs = {"overwrites": overwrites}
+    category = channel.guild.get_channel(category_id)
+    if category and isinstance(category, discord.CategoryChannel):
+        edit_kwargs["category"] = category
+
+    if ticket:
+        await store.update(channel.id, status=status, **fields)
+    await channel.edit(**edit_kwargs)
+
+async def close_ticket(channel: discord.TextChannel, store: TicketStore, closed_by: int = None):
+    await apply_ticket_state(channel, store, 'closed', claimed_by=None, closed_at=time.time(), closed_by=closed_by)
+
+async def open_ticket(channel: discord.TextChannel, store: TicketStore):
+    await apply_ticket_state(channel, store, 'open', closed_at=None, closed_by=None)
+
+
 class ConfirmDeleteView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
 
     @discord.ui.button(label="✅ Ja, löschen!", style=discord.ButtonStyle.red, custom_id="confirm_delete_button")
     async def confirm_delete_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_message("Ticket wird in 5 Sekunden gelöscht....", ephemeral=True)
+        await interaction.response.send_message("Ticket wird archiviert und anschließend gelöscht....", ephemeral=True)
 
         channel = interaction.channel
-        await asyncio.sleep(5)
+        cog = interaction.client.get_cog('TicketCog')
 
-        async with aiosqlite.connect(TICKETS_DB) as db:
-            await db.execute("DELETE FROM tickets WHERE channel_id = ?", (channel.id,))
-            await db.commit()
+        try:
+            archive_path = await cog.archiver.archive(channel)
+        except Exception as e:
+            print(f"❌ Fehler beim Archivieren von Ticket {channel.id}: {e}")
+            return await interaction.followup.send(f"❌ Das Ticket konnte nicht archiviert werden und wurde nicht gelöscht: {e}", ephemeral=True)
+
+        await archive_and_delete_record(cog.store, channel.id, archive_path)
+        cog.autoclose.cancel(channel.id)
 
         await channel.delete()
 
@@ -109,51 +362,18 @@ class ClosedTicketView(discord.ui.View):
             return await interaction.response.send_message("⚠️ Du hast dazu keine Berechtigung!", ephemeral=True)
 
         channel = interaction.channel
+        store = ticket_store(interaction.client)
 
-        # Rollen, die immer Zugriff haben sollen (für die Bereinigungslogik beim Öffnen/Schließen)
-        all_team_role_ids = [supporter_role_id, mod_role_id, administrator_role_id, ALL_TICKETS_ACCESS_ROLE_ID]
-
-        overwrites_to_update = {}
-        for target, permissions in channel.overwrites.items():
-            if isinstance(target, (discord.Member, discord.User, discord.Role)) and permissions.read_messages:
-                is_team_or_bot = isinstance(target, discord.Role) and target.id in all_team_role_ids or target.id == interaction.guild.me.id
-
-                ticket_data_temp = await get_ticket_data(channel.id)
-                is_ticket_creator = ticket_data_temp and target.id == ticket_data_temp[0]
-
-                if not is_team_or_bot and not is_ticket_creator:
-                    overwrites_to_update[target] = discord.PermissionOverwrite(
-                        send_messages=True,
-                        read_messages=True,
-                        read_message_history=True
-                    )
-
-
-        ticket_data = await get_ticket_data(channel.id)
-        if not ticket_data:
+        if not store.get(channel.id):
             return await interaction.response.send_message("❌ Fehler: Ticket nicht in der Datenbank gefunden!", ephemeral=True)
 
-        user_id = ticket_data[0]
-        member = interaction.guild.get_member(user_id)
-        if member:
-            overwrites_to_update[member] = discord.PermissionOverwrite(
-                send_messages=True,
-                read_messages=True,
-                read_message_history=True
-            )
-
-        for target, overwrite in overwrites_to_update.items():
-            await channel.set_permissions(target, overwrite=overwrite)
-
-        async with aiosqlite.connect(TICKETS_DB) as db:
-            await db.execute("UPDATE tickets SET status = ? WHERE channel_id = ?", ('open', channel.id))
-            await db.commit()
-
-        await move_ticket_category(channel, 'open')
-
         embed = discord.Embed(title="🔓 Ticket geöffnet", description=f"{interaction.user.mention} hat das Ticket geöffnet.", color=discord.Color.dark_blue())
         await interaction.response.send_message(embed=embed, view=OpenTicketView())
 
+        # Overwrites und Kategorie werden nach der Antwort in einem einzigen Request gesetzt
+        run_in_background(open_ticket(channel, store), f"Ticket {channel.id} öffnen")
+        interaction.client.get_cog('TicketCog').touch(channel.id)
+
     @discord.ui.button(label="⛔ Löschen", style=discord.ButtonStyle.red, custom_id="delete_ticket_button")
     async def delete_ticket_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
         if not interaction.user.guild_permissions.manage_messages:
@@ -176,42 +396,7 @@ class OpenTicketView(discord.ui.View):
             return await interaction.response.send_message("⚠️ Du hast keine Berechtigung dazu!", ephemeral=True)
 
         channel = interaction.channel
-
-        # Rollen, die immer Zugriff haben sollen (für die Bereinigungslogik beim Öffnen/Schließen)
-        all_team_role_ids = [supporter_role_id, mod_role_id, administrator_role_id, ALL_TICKETS_ACCESS_ROLE_ID]
-
-        overwrites_to_update = {}
-        # Gehe alle Overwrites durch, um alle User/Rollen zu finden, die keine Team-Rolle sind, aber schreiben dürfen
-        for target, permissions in channel.overwrites.items():
-            is_team_or_bot = (isinstance(target, discord.Role) and target.id in all_team_role_ids) or target.id == interaction.guild.me.id
-
-            if not is_team_or_bot and permissions.send_messages:
-                overwrites_to_update[target] = discord.PermissionOverwrite(
-                    send_messages=False,
-                    read_messages=True,
-                    read_message_history=True
-                )
-
-        # Stelle sicher, dass der Ticketersteller auch das Schreiben verliert
-        ticket_data = await get_ticket_data(channel.id)
-        if ticket_data:
-            user_id = ticket_data[0]
-            member = interaction.guild.get_member(user_id)
-            if member:
-                overwrites_to_update[member] = discord.PermissionOverwrite(
-                    send_messages=False,
-                    read_messages=True,
-                    read_message_history=True
-                )
-
-        for target, overwrite in overwrites_to_update.items():
-            await channel.set_permissions(target, overwrite=overwrite)
-
-        async with aiosqlite.connect(TICKETS_DB) as db:
-            await db.execute("UPDATE tickets SET status = ?, claimed_by = NULL WHERE channel_id = ?", ('closed', channel.id))
-            await db.commit()
-
-        await move_ticket_category(channel, 'closed')
+        store = ticket_store(interaction.client)
 
         embed = discord.Embed(
             title="🔒 Ticket geschlossen",
@@ -220,6 +405,10 @@ class OpenTicketView(discord.ui.View):
         )
         await interaction.response.send_message(embed=embed, view=ClosedTicketView())
 
+        # Overwrites und Kategorie werden nach der Antwort in einem einzigen Request gesetzt
+        run_in_background(close_ticket(channel, store, interaction.user.id), f"Ticket {channel.id} schließen")
+        interaction.client.get_cog('TicketCog').autoclose.cancel(channel.id)
+
 class TicketClaimView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
@@ -229,177 +418,156 @@ class TicketClaimView(discord.ui.View):
         if not interaction.user.guild_permissions.manage_messages:
             return await interaction.response.send_message("⚠️ Du hast keine Berechtigung dazu!", ephemeral=True)
 
-        ticket_data = await get_ticket_data(interaction.channel.id)
+        store = ticket_store(interaction.client)
+        ticket_data = store.get(interaction.channel.id)
         if not ticket_data:
             return await interaction.response.send_message("❌ Fehler: Ticket nicht in der Datenbank gefunden!", ephemeral=True)
 
-        claimed_by_id = ticket_data[2]
+        claimed_by_id = ticket_data['claimed_by']
         new_claimed_by_id = None
 
-        async with aiosqlite.connect(TICKETS_DB) as db:
-            if claimed_by_id is None:
-                new_claimed_by_id = interaction.user.id
-                await db.execute("UPDATE tickets SET claimed_by = ?, status = 'claimed' WHERE channel_id = ?", (new_claimed_by_id, interaction.channel.id))
-                embed = discord.Embed(description=f"{interaction.user.mention} hat dieses Ticket **geclaimt**.", color=discord.Color.dark_blue())
-                await move_ticket_category(interaction.channel, 'claimed', claimed_by_id=new_claimed_by_id)
-            elif claimed_by_id == interaction.user.id:
-                await db.execute("UPDATE tickets SET claimed_by = NULL, status = 'open' WHERE channel_id = ?", (interaction.channel.id,))
-                embed = discord.Embed(description=f"{interaction.user.mention} hat das Ticket **freigegeben**.", color=discord.Color.dark_blue())
-                await move_ticket_category(interaction.channel, 'open', claimed_by_id=None)
-            else:
-                claimer = interaction.guild.get_member(claimed_by_id)
-                claimer_mention = claimer.mention if claimer else f"einem Benutzer (<@{claimed_by_id}>)"
-                return await interaction.response.send_message(f"Dieses Ticket ist bereits von {claimer_mention} geclaimt.", ephemeral=True)
+        if claimed_by_id is None:
+            new_claimed_by_id = interaction.user.id
+            fields = {}
+            if ticket_data['claimed_at'] is None:
+                # Für die Statistik zählt nur der erste Claim
+                fields = {'claimed_at': time.time(), 'first_claimed_by': new_claimed_by_id}
+            await store.update(interaction.channel.id, claimed_by=new_claimed_by_id, status='claimed', **fields)
+            embed = discord.Embed(description=f"{interaction.user.mention} hat dieses Ticket **geclaimt**.", color=discord.Color.dark_blue())
+            await move_ticket_category(interaction.channel, 'claimed', claimed_by_id=new_claimed_by_id)
+        elif claimed_by_id == interaction.user.id:
+            await store.update(interaction.channel.id, claimed_by=None, status='open')
+            embed = discord.Embed(description=f"{interaction.user.mention} hat das Ticket **freigegeben**.", color=discord.Color.dark_blue())
+            await move_ticket_category(interaction.channel, 'open', claimed_by_id=None)
+        else:
+            claimer = interaction.guild.get_member(claimed_by_id)
+            claimer_mention = claimer.mention if claimer else f"einem Benutzer (<@{claimed_by_id}>)"
+            return await interaction.response.send_message(f"Dieses Ticket ist bereits von {claimer_mention} geclaimt.", ephemeral=True)
 
-            await db.commit()
-            await interaction.response.send_message(embed=embed)
+        await interaction.response.send_message(embed=embed)
 
 
-class PersistentTicketTypeSelect(discord.ui.Select):
+class TicketControlView(TicketClaimView, OpenTicketView):
+    """Schließen- und Claim-Button in einer Nachricht; die custom_ids werden von den registrierten Views bedient."""
     def __init__(self):
-        options = [
-            # discord.SelectOption(label="MC Server Entbannungsantrag", value="mc_unban_appeal", description="Ticket für eine Entbannungsanfrage auf dem Minecraft Server.", emoji="🔨"), # ENTFERNT
-            discord.SelectOption(label="Nutzer-Meldung", value="user_report", description="Melde einen Nutzer, der gegen die Regeln verstößt.", emoji="🚫"),
-            discord.SelectOption(label="Allgemeine Hilfe", value="general_help", description="Stelle allgemeine Fragen zum Discord oder Server.", emoji="❓"),
-            discord.SelectOption(label="Bewerbung", value="application", description="Reiche deine Teambewerbung ein.", emoji="📝"),
-            discord.SelectOption(label="Login-Probleme", value="login_issue", description="Probleme beim Einloggen oder bei der Registrierung.", emoji="🔑"), # NEU
-            discord.SelectOption(label="Bug-Report", value="bug_report", description="Melde einen Fehler (Bug) im Spiel oder auf dem Discord.", emoji="🐞"), # NEU
-            discord.SelectOption(label="Sonstiges", value="other", description="Für alle anderen Anfragen.", emoji="✉️")
-        ]
-        super().__init__(placeholder="Wähle den Ticket-Typ...", min_values=1, max_values=1, options=options, custom_id="persistent_ticket_type_select")
-
-    async def callback(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True)
-
-        selected_value = self.values[0]
-        guild = interaction.guild
-        member = interaction.user
+        discord.ui.View.__init__(self, timeout=None)
 
-        ticket_title = ""
-        ticket_description = ""
 
-        # Lege die Rollen fest, die Zugriff haben sollen
-        team_access_roles = []
+class StageTimer:
+    """Misst die Dauer der einzelnen Schritte der Ticketerstellung."""
 
-        # --- Logik zur Bestimmung des Zugriffs ---
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.stages = []
 
-        if selected_value == "user_report":
-            # Nutzermeldung: ab Mods (Mod, Admin)
-            team_access_roles = [mod_role_id, administrator_role_id]
-            ticket_title = f"Nutzer-Meldung von {member.display_name}"
-            ticket_description = "Bitte gib den Namen des Nutzers und Beweise (Screenshots/Videos) des Verstoßes an."
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages.append((stage, (now - self.last) * 1000))
+        self.last = now
 
-        elif selected_value == "general_help":
-            # Allgemeine Hilfe: ab Supporter (Supporter, Mod, Admin)
-            team_access_roles = [supporter_role_id, mod_role_id, administrator_role_id]
-            ticket_title = f"Allgemeine Hilfe für {member.display_name}"
-            ticket_description = "Bitte beschreibe, wobei du Hilfe brauchst, so detailliert wie möglich. Das Team wird dir in Kürze helfen."
+    def summary(self) -> str:
+        parts = [f"{stage}={ms:.0f}ms" for stage, ms in self.stages]
+        parts.append(f"gesamt={(self.last - self.started) * 1000:.0f}ms")
+        return ", ".join(parts)
 
-        elif selected_value == "application":
-            # Bewerbung: Admin (Nur Admin)
-            team_access_roles = [administrator_role_id]
-            ticket_title = f"Bewerbung von {member.display_name}"
-            ticket_description = "Bitte stelle dich kurz vor und beschreibe, wofür du dich bewirbst und warum du dafür geeignet bist."
 
-        elif selected_value == "login_issue": # NEU
-            # Login-Probleme: ab Supporter (Supporter, Mod, Admin)
-            team_access_roles = [supporter_role_id, mod_role_id, administrator_role_id]
-            ticket_title = f"Login-Problem von {member.display_name}"
-            ticket_description = "Bitte beschreibe genau, wann das Problem auftritt und ob du eine Fehlermeldung erhältst."
+# User, deren Ticket gerade erstellt wird (verhindert Duplikate bei schnellen Doppelklicks)
+_tickets_in_creation = set()
 
-        elif selected_value == "bug_report": # NEU
-            # Bug-Report: ab Supporter (Supporter, Mod, Admin)
-            team_access_roles = [supporter_role_id, mod_role_id, administrator_role_id]
-            ticket_title = f"Bug-Report von {member.display_name}"
-            ticket_description = "Bitte beschreibe den Bug, wie man ihn reproduziert, und füge wenn möglich Screenshots/Videos bei."
 
-        elif selected_value == "other":
-            # Sonstiges: ab Supporter (Supporter, Mod, Admin)
-            team_access_roles = [supporter_role_id, mod_role_id, administrator_role_id]
-            ticket_title = f"Sonstige Anfrage von {member.display_name}"
-            ticket_description = "Bitte beschreibe dein Anliegen so detailliert wie möglich."
+class PersistentTicketTypeSelect(discord.ui.Select):
+    def __init__(self):
+        super().__init__(placeholder="Wähle den Ticket-Typ...", min_values=1, max_values=1, options=list(TICKET_TYPES.select_options), custom_id="persistent_ticket_type_select")
 
+    async def callback(self, interaction: discord.Interaction):
+        timer = StageTimer()
 
-        # --- PING-LOGIK: Nur User und ticket_ping_role_id (wie gewünscht) ---
-        ping_role_mentions = ""
-        if ticket_ping_role_id:
-            ping_role = guild.get_role(ticket_ping_role_id)
-            if ping_role:
-                ping_role_mentions = ping_role.mention
+        # Die Bestätigung der Interaktion setzt gleichzeitig die Auswahl im Panel zurück,
+        # dadurch entfällt das nachträgliche Bearbeiten der Panel-Nachricht
+        if interaction.message is not None:
+            await interaction.response.edit_message(view=self.view)
+        else:
+            await interaction.response.defer(ephemeral=True)
+        timer.mark("ack")
 
-        # Der Content für die erste Nachricht
-        ping_content = f"{member.mention} {ping_role_mentions}"
+        ticket_type = TICKET_TYPES.get(self.values[0])
+        guild = interaction.guild
+        member = interaction.user
 
+        if ticket_type is None:
+            return await interaction.followup.send("❌ Fehler: Unbekannter Ticket-Typ!", ephemeral=True)
 
-        # Entferne Duplikate in team_access_roles und sorge dafür, dass die IDs gültig sind
-        final_access_role_ids = list(set(team_access_roles))
+        store = ticket_store(interaction.client)
+        existing_ticket = store.open_ticket_of(member.id)
 
-        async with aiosqlite.connect(TICKETS_DB) as db:
-            async with db.execute("SELECT channel_id FROM tickets WHERE user_id = ? AND status IN ('open', 'claimed')", (member.id,)) as cursor:
-                existing_ticket = await cursor.fetchone()
+        if existing_ticket:
+            return await interaction.followup.send(f"Du hast bereits ein offenes Ticket: <#{existing_ticket['channel_id']}>", ephemeral=True)
 
-            if existing_ticket:
-                return await interaction.followup.send(f"Du hast bereits ein offenes Ticket: <#{existing_ticket[0]}>", ephemeral=True)
+        if member.id in _tickets_in_creation:
+            return await interaction.followup.send("⏳ Dein Ticket wird bereits erstellt.", ephemeral=True)
 
-            category = guild.get_channel(OPEN_CATEGORY_ID)
-            if not category:
-                await interaction.followup.send("❌ Fehler: Kategorie nicht gefunden!", ephemeral=True)
-                return
+        category = guild.get_channel(OPEN_CATEGORY_ID)
+        if not category:
+            await interaction.followup.send("❌ Fehler: Kategorie nicht gefunden!", ephemeral=True)
+            return
 
-            op = member
-            all_access_role = guild.get_role(ALL_TICKETS_ACCESS_ROLE_ID)
+        _tickets_in_creation.add(member.id)
+        try:
+            await self.create_ticket(interaction, timer, ticket_type, category)
+        finally:
+            _tickets_in_creation.discard(member.id)
 
-            overwrites = {
-                guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                op: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-                guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-            }
+        print(f"[Ticket] Erstellung für {member} ({ticket_type.value}): {timer.summary()}")
 
-            # Die ALL_TICKETS_ACCESS_ROLE_ID hat immer Zugriff (muss existieren)
-            if all_access_role:
-                overwrites[all_access_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+    async def create_ticket(self, interaction: discord.Interaction, timer: StageTimer, ticket_type, category):
+        guild = interaction.guild
+        member = interaction.user
+        cog = interaction.client.get_cog('TicketCog')
+        store = cog.store
 
+        # Automatische Zuweisung: das Ticket landet direkt geclaimt in der Claimed-Kategorie
+        assignee = cog.pick_assignee(guild, ticket_type) if cog.auto_assign else None
+        if assignee:
+            claimed_category = guild.get_channel(CLAIMED_CATEGORY_ID)
+            if claimed_category and isinstance(claimed_category, discord.CategoryChannel):
+                category = claimed_category
 
-            # Füge die spezifischen Rollen mit Zugriff hinzu
-            for role_id in final_access_role_ids:
-                # Hier stellen wir sicher, dass wir die ALL_TICKETS_ACCESS_ROLE nicht doppelt hinzufügen, falls sie in den final_access_role_ids ist
-                if role_id != ALL_TICKETS_ACCESS_ROLE_ID:
-                    role = guild.get_role(role_id)
-                    if role:
-                        overwrites[role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+        # --- PING-LOGIK: Nur User und ticket_ping_role_id (wie gewünscht) ---
+        ping_role = guild.get_role(ticket_ping_role_id) if ticket_ping_role_id else None
+        ping_content = f"{member.mention} {ping_role.mention if ping_role else ''}"
+        if assignee:
+            ping_content += f" {assignee.mention}"
 
-            channel_name_prefix = selected_value.split('_')[0] if selected_value.find('_') != -1 else selected_value
-            channel_name = f"ticket-{channel_name_prefix}-{member.name}"[:100]
-            new_channel = await guild.create_text_channel(name=channel_name.lower(), overwrites=overwrites, category=category)
+        # Vorberechnete Vorlage kopieren und nur noch den Ersteller ergänzen
+        overwrites = dict(TICKET_TYPES.overwrite_template(guild, ticket_type.value))
+        overwrites[member] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
 
-            await db.execute(
-                "INSERT INTO tickets (channel_id, user_id, status) VALUES (?, ?, ?)",
-                (new_channel.id, member.id, 'open')
-            )
-            await db.commit()
+        channel_name = f"ticket-{ticket_type.channel_prefix}-{member.name}"[:100]
+        timer.mark("vorbereitung")
+        new_channel = await guild.create_text_channel(name=channel_name.lower(), overwrites=overwrites, category=category)
+        timer.mark("kanal")
 
         embed = discord.Embed(
-            title=ticket_title,
-            description=ticket_description,
+            title=ticket_type.title.format(member=member.display_name),
+            description=ticket_type.message.format(member=member.display_name),
             color=discord.Color.dark_blue()
         )
-
-        # Verwende den neuen ping_content
-        await new_channel.send(embed=embed, view=OpenTicketView(), content=ping_content)
-        await new_channel.send(view=TicketClaimView())
+        if assignee:
+            embed.add_field(name="👤 Zugewiesen an", value=assignee.mention)
+
+        # Eine einzige Nachricht mit Schließen- und Claim-Button; der DB-Eintrag läuft parallel dazu
+        await asyncio.gather(
+            store.create(
+                new_channel.id, member.id, ticket_type=ticket_type.value,
+                status='claimed' if assignee else 'open', claimed_by=assignee.id if assignee else None
+            ),
+            new_channel.send(embed=embed, view=TicketControlView(), content=ping_content)
+        )
+        timer.mark("nachricht+db")
+        cog.touch(new_channel.id)
 
         await interaction.followup.send(f"Dein Ticket wurde erstellt: {new_channel.mention}", ephemeral=True)
-
-        current_view = self.view
-
-        current_view.clear_items()
-
-        current_view.add_item(PersistentTicketTypeSelect())
-
-        try:
-            await interaction.message.edit(view=current_view)
-        except discord.HTTPException:
-            pass
+        timer.mark("antwort")
 
 
 class TicketCreateView(discord.ui.View):
@@ -411,10 +579,106 @@ class TicketCreateView(discord.ui.View):
 class TicketCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.store = TicketStore(tickets_db(bot))
+        self.archiver = TicketArchiver()
+        self.autoclose = DeadlineScheduler(self.auto_close_ticket)
+        self._autoclose_loaded = False
+        self.deletion_queue = RateLimitedQueue()
+        self._purge_running = False
+        self.auto_assign = False
+
+    async def cog_load(self):
+        await init_db(self.store.db)
+        await self.store.load()
+        row = await self.store.db.fetchone("SELECT value FROM ticket_settings WHERE key = 'auto_assign'")
+        self.auto_assign = bool(row and row[0] == '1')
+        self.autoclose.start()
+
+    async def cog_unload(self):
+        self.autoclose.stop()
+        self.deletion_queue.stop()
+
+    def touch(self, channel_id: int, last_activity: float = None):
+        """Setzt die Inaktivitäts-Deadline eines offenen Tickets neu."""
+        self.autoclose.schedule(channel_id, (last_activity or time.time()) + TICKET_INACTIVITY_TIMEOUT)
+
+    def rebuild_autoclose(self):
+        # Letzte Aktivität aus der ID der letzten Nachricht (Snowflake) ableiten, sonst Erstellungszeit
+        for ticket in self.store.with_status('open', 'claimed'):
+            channel = self.bot.get_channel(ticket['channel_id'])
+            if channel is None:
+                continue
+            if channel.last_message_id:
+                last_activity = discord.utils.snowflake_time(channel.last_message_id).timestamp()
+            else:
+                last_activity = ticket['created_at'] or discord.utils.snowflake_time(channel.id).timestamp()
+            self.touch(channel.id, last_activity)
+        print(f"✅ Auto-Close für {len(self.autoclose)} offene Tickets geplant.")
+
+    async def auto_close_ticket(self, channel_id: int):
+        ticket = self.store.get(channel_id)
+        channel = self.bot.get_channel(channel_id)
+        if ticket is None or channel is None or ticket['status'] not in ('open', 'claimed'):
+            return
+
+        await close_ticket(channel, self.store)
+        embed = discord.Embed(
+            title="🔒 Ticket automatisch geschlossen",
+            description="Das Ticket wurde wegen Inaktivität automatisch geschlossen.",
+            color=discord.Color.dark_blue()
+        )
+        await channel.send(embed=embed, view=ClosedTicketView())
+
+    @staticmethod
+    def is_staff(member: discord.Member) -> bool:
+        return not member.bot and any(role.id in TEAM_ROLE_IDS for role in member.roles)
+
+    def load_staff(self):
+        self.store.loads.set_staff(
+            member.id for guild in self.bot.guilds for member in guild.members if self.is_staff(member)
+        )
+
+    def pick_assignee(self, guild: discord.Guild, ticket_type):
+        """Das am wenigsten ausgelastete Teammitglied, das online ist und die nötige Rollenstufe hat."""
+        allowed_role_ids = set(ticket_type.role_ids) | {ALL_TICKETS_ACCESS_ROLE_ID}
+
+        def eligible(staff_id):
+            staff = guild.get_member(staff_id)
+            if staff is None or staff.status == discord.Status.offline:
+                return False
+            return any(role.id in allowed_role_ids for role in staff.roles)
+
+        staff_id = self.store.loads.pick(eligible)
+        return guild.get_member(staff_id) if staff_id else None
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles == after.roles:
+            return
+        if self.is_staff(after):
+            self.store.loads.add_staff(after.id)
+        else:
+            self.store.loads.remove_staff(after.id)
+
+    @app_commands.command(name="ticket-autoassign", description="ADMIN: Neue Tickets automatisch dem am wenigsten ausgelasteten Teammitglied zuweisen.")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(aktiv="Automatische Zuweisung ein- oder ausschalten.")
+    async def ticket_autoassign(self, interaction: discord.Interaction, aktiv: bool):
+        await self.store.db.execute(
+            "INSERT OR REPLACE INTO ticket_settings (key, value) VALUES ('auto_assign', ?)",
+            ('1' if aktiv else '0',)
+        )
+        self.auto_assign = aktiv
+        state = "aktiviert" if aktiv else "deaktiviert"
+        await interaction.response.send_message(f"✅ Automatische Ticket-Zuweisung {state}.", ephemeral=True)
 
     @commands.Cog.listener()
     async def on_ready(self):
-        await init_db()
+        if not self._autoclose_loaded:
+            self._autoclose_loaded = True
+            self.rebuild_autoclose()
+        self.load_staff()
+
         self.bot.add_view(TicketCreateView())
         self.bot.add_view(OpenTicketView())
         self.bot.add_view(ClosedTicketView())
@@ -431,6 +695,157 @@ class TicketCog(commands.Cog):
         )
         await ctx.send(embed=embed, view=TicketCreateView())
 
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        TICKET_TYPES.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        TICKET_TYPES.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.guild is None or message.author.bot:
+            return
+
+        ticket = self.store.get(message.channel.id)
+        if ticket is None:
+            return
+
+        if ticket['status'] in ('open', 'claimed'):
+            self.touch(message.channel.id)
+
+        if ticket['first_staff_reply_at'] is not None or message.author.id == ticket['user_id']:
+            return
+
+        if isinstance(message.author, discord.Member) and message.channel.permissions_for(message.author).manage_messages:
+            await self.store.update(message.channel.id, first_staff_reply_at=time.time())
+
+    @app_commands.command(name="ticket-stats", description="Zeigt Reaktions- und Bearbeitungszeiten der Tickets.")
+    @app_commands.checks.has_permissions(manage_messages=True)
+    async def ticket_stats(self, interaction: discord.Interaction):
+        stats = self.store.stats
+        embed = discord.Embed(
+            title="📊 Ticket-Statistik",
+            description="Werte: p50 / p90 / p99 (Anzahl)",
+            color=discord.Color.dark_blue()
+        )
+
+        def lines(table, label):
+            # Die meistgenutzten Einträge zuerst; Discord erlaubt max. 1024 Zeichen pro Feld
+            entries = sorted(table.items(), key=lambda item: item[1].count, reverse=True)[:15]
+            text = "\n".join(f"{label(key)}: {stats.summary(histogram)}" for key, histogram in entries)
+            return text[:1024] or "Keine Daten"
+
+        embed.add_field(name="⏱️ Zeit bis Claim je Typ", value=lines(stats.claim_by_type, TICKET_TYPES.label), inline=False)
+        embed.add_field(name="🔒 Zeit bis Schließen je Typ", value=lines(stats.close_by_type, TICKET_TYPES.label), inline=False)
+        embed.add_field(name="👤 Zeit bis Claim je Teammitglied", value=lines(stats.claim_by_staff, lambda key: f"<@{key}>"), inline=False)
+        embed.add_field(name="👤 Zeit bis Schließen je Teammitglied", value=lines(stats.close_by_staff, lambda key: f"<@{key}>"), inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="ticket-purge", description="ADMIN: Löscht alle geschlossenen Tickets, die älter als N Tage sind.")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(tage="Nur Tickets löschen, die seit mindestens so vielen Tagen geschlossen sind.", archivieren="Transkripte vor dem Löschen archivieren.")
+    async def ticket_purge(self, interaction: discord.Interaction, tage: app_commands.Range[int, 0, 3650], archivieren: bool = True):
+        if self._purge_running:
+            return await interaction.response.send_message("⏳ Es läuft bereits eine Bereinigung.", ephemeral=True)
+        # Sofort setzen, damit ein zweiter Aufruf während der folgenden awaits nicht ebenfalls startet
+        self._purge_running = True
+        try:
+            await self.start_purge(interaction, tage, archivieren)
+        except BaseException:
+            self._purge_running = False
+            raise
+
+    async def start_purge(self, interaction: discord.Interaction, tage: int, archivieren: bool):
+        cutoff = time.time() - tage * 86400
+        channel_ids = []
+        for ticket in self.store.with_status('closed'):
+            # Alte Tickets ohne closed_at: Erstellungszeit des Kanals als Näherung
+            closed_at = ticket['closed_at'] or discord.utils.snowflake_time(ticket['channel_id']).timestamp()
+            if closed_at <= cutoff:
+                channel_ids.append(ticket['channel_id'])
+
+        if not channel_ids:
+            self._purge_running = False
+            return await interaction.response.send_message(f"ℹ️ Keine geschlossenen Tickets älter als {tage} Tage gefunden.", ephemeral=True)
+
+        await interaction.response.send_message(f"🧹 {len(channel_ids)} Tickets werden im Hintergrund gelöscht.", ephemeral=True)
+        # Eigene Statusnachricht statt Followup, da Interaktions-Tokens nach 15 Minuten ablaufen
+        status_message = await interaction.channel.send(embed=self.purge_embed(0, 0, len(channel_ids)))
+
+        run_in_background(self.purge_tickets(channel_ids, archivieren, status_message), "Ticket-Bereinigung")
+
+    @staticmethod
+    def purge_embed(done: int, failed: int, total: int, finished: bool = False, archived: int = None):
+        description = f"Gelöscht: **{done}** / {total}\nFehlgeschlagen: **{failed}**"
+        if archived is not None:
+            description = f"Archiviert: **{archived}** / {total}\n" + description
+        return discord.Embed(
+            title="✅ Ticket-Bereinigung abgeschlossen" if finished else "🧹 Ticket-Bereinigung läuft...",
+            description=description,
+            color=discord.Color.green() if finished else discord.Color.dark_blue()
+        )
+
+    async def purge_tickets(self, channel_ids, archive: bool, status_message: discord.Message):
+        archive_paths = {}
+        failed = 0
+        last_update = time.monotonic()
+
+        async def report_progress(done: int, archived: int = None):
+            # Statusnachricht höchstens alle 5 Sekunden bearbeiten
+            nonlocal last_update
+            if time.monotonic() - last_update < 5:
+                return
+            last_update = time.monotonic()
+            try:
+                await status_message.edit(embed=self.purge_embed(done, failed, len(channel_ids), archived=archived))
+            except discord.HTTPException:
+                pass
+
+        try:
+            deletions = []
+            for channel_id in channel_ids:
+                channel = self.bot.get_channel(channel_id)
+                if channel is None:
+                    # Kanal existiert nicht mehr, nur den Datensatz bereinigen
+                    archive_paths[channel_id] = None
+                    continue
+
+                path = None
+                if archive:
+                    try:
+                        path = await self.archiver.archive(channel)
+                    except Exception as e:
+                        print(f"❌ Fehler beim Archivieren von Ticket {channel_id}: {e}")
+                        failed += 1
+                        await report_progress(len(archive_paths), len(deletions))
+                        continue
+                    await report_progress(len(archive_paths), len(deletions) + 1)
+
+                future = self.deletion_queue.submit("channel_delete", lambda channel=channel: channel.delete(reason="Ticket-Bereinigung"))
+                deletions.append((channel_id, path, future))
+
+            for channel_id, path, future in deletions:
+                try:
+                    await future
+                    archive_paths[channel_id] = path
+                except discord.NotFound:
+                    archive_paths[channel_id] = path
+                except Exception as e:
+                    print(f"❌ Fehler beim Löschen von Ticket {channel_id}: {e}")
+                    failed += 1
+
+                await report_progress(len(archive_paths))
+
+            # Alle Datensätze in einer Transaktion
+            await self.store.mark_deleted(archive_paths)
+        finally:
+            self._purge_running = False
+
+        await status_message.edit(embed=self.purge_embed(len(archive_paths), failed, len(channel_ids), finished=True))
+
     @commands.Cog.listener()
     async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
         if isinstance(error, commands.MissingPermissions):
@@ -0,0 +1,99 @@
+"""Vergleicht den Durchsatz der ModMail-Fall-Abfrage pro DM: pymongo im ThreadPoolExecutor (alt) gegen motor (neu).
+
+Simuliert einen Schwall gleichzeitiger DMs, von denen jede wie ModMail.on_message den offenen Fall des Users lädt.
+Verwendet eine eigene Collection, die am Ende wieder gelöscht wird.
+
+    python benchmarks/modmail_store.py --messages 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import random
+import sys
+import time
+
+import dotenv
+import motor.motor_asyncio as motor
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from modmail import DB_NAME, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_TIMEOUT_MS  # noqa: E402
+
+dotenv.load_dotenv()
+
+BENCHMARK_COLLECTION = "modmail_benchmark"
+
+
+async def run_burst(lookup, user_ids, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def relay(user_id):
+        async with semaphore:
+            await lookup(user_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(relay(user_id) for user_id in user_ids))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000, help="Anzahl simulierter DMs")
+    parser.add_argument("--concurrency", type=int, default=50, help="Gleichzeitig verarbeitete DMs")
+    parser.add_argument("--cases", type=int, default=500, help="Anzahl offener Fälle in der Test-Collection")
+    args = parser.parse_args()
+
+    mongo_uri = os.getenv("MONGO_URI")
+    sync_client = MongoClient(mongo_uri)
+    sync_collection = sync_client[DB_NAME][BENCHMARK_COLLECTION]
+    async_client = motor.AsyncIOMotorClient(
+        mongo_uri,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGO_TIMEOUT_MS
+    )
+    async_collection = async_client[DB_NAME][BENCHMARK_COLLECTION]
+
+    sync_collection.drop()
+    sync_collection.create_index("user_id", unique=True)
+    sync_collection.insert_many([
+        {"user_id": user_id, "post_id": user_id + 1, "type": "modmail"} for user_id in range(args.cases)
+    ])
+    # Auch DMs ohne offenen Fall, wie im echten Betrieb
+    user_ids = [random.randrange(args.cases * 2) for _ in range(args.messages)]
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
+    loop = asyncio.get_running_loop()
+
+    async def lookup_executor(user_id):
+        return await loop.run_in_executor(executor, sync_collection.find_one, {"user_id": user_id, "type": "modmail"})
+
+    async def lookup_motor(user_id):
+        return await async_collection.find_one({"user_id": user_id, "type": "modmail"})
+
+    try:
+        # Aufwärmen, damit Verbindungsaufbau nicht mitgemessen wird
+        await run_burst(lookup_executor, user_ids[:50], args.concurrency)
+        await run_burst(lookup_motor, user_ids[:50], args.concurrency)
+
+        results = {}
+        for name, lookup in (("pymongo + ThreadPoolExecutor(5)", lookup_executor), (f"motor (Pool {MONGO_MAX_POOL_SIZE})", lookup_motor)):
+            elapsed = await run_burst(lookup, user_ids, args.concurrency)
+            results[name] = elapsed
+            print(f"{name:<34} {elapsed:7.3f}s  {args.messages / elapsed:9.1f} DMs/s")
+
+        before, after = results.values()
+        print(f"Faktor: {before / after:.2f}x")
+    finally:
+        executor.shutdown()
+        sync_collection.drop()
+        sync_client.close()
+        async_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
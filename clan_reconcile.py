@@ -0,0 +1,143 @@
+import re
+
+# Rollen, die ein Clan bei der Erstellung bekommt ("TAG-Admin", "TAG-Member")
+CLAN_ROLE_REGEX = re.compile(r"^(\S{1,5})-(Admin|Member)$")
+ROLE_KEYS = ("admin_role_id", "member_role_id")
+CHANNEL_KEYS = ("main_channel_id", "voice_channel_id")
+CLAN_CHANNEL_NAMES = ("💬-chat", "🔊 Voice")
+
+
+class ClanDrift:
+    """Abweichungen zwischen MongoDB und dem Server."""
+
+    def __init__(self):
+        # Vom Bot erstellte (registrierte) Rollen/Kanäle, die kein Clan mehr verwendet; dürfen gelöscht werden
+        self.orphan_roles = []
+        self.orphan_channels = []
+        # Sehen nach Clan-Rollen/-Kanälen aus, sind aber nicht registriert; werden nur gemeldet
+        self.unverified_roles = []
+        self.unverified_channels = []
+        self.orphan_member_tags = set()
+        # Tag -> fehlende Felder akzeptierter Clans (gelöschte Rollen/Kanäle)
+        self.broken_clans = {}
+        # Registrierte IDs, die es auf dem Server nicht mehr gibt
+        self.stale_resource_ids = set()
+
+    def __bool__(self):
+        return bool(
+            self.orphan_roles or self.orphan_channels or self.unverified_roles or self.unverified_channels
+            or self.orphan_member_tags or self.broken_clans
+        )
+
+    def summary_lines(self):
+        lines = []
+        if self.orphan_roles:
+            lines.append(f"🎭 Verwaiste Rollen ({len(self.orphan_roles)}): " + ", ".join(role.name for role in self.orphan_roles))
+        if self.orphan_channels:
+            lines.append(f"💬 Verwaiste Kanäle ({len(self.orphan_channels)}): " + ", ".join(channel.mention for channel in self.orphan_channels))
+        if self.unverified_roles or self.unverified_channels:
+            names = [role.name for role in self.unverified_roles] + [channel.mention for channel in self.unverified_channels]
+            lines.append(f"❔ Nicht vom Bot erstellt, bitte manuell prüfen ({len(names)}): " + ", ".join(names))
+        if self.orphan_member_tags:
+            lines.append(f"📄 Mitgliederlisten ohne Clan ({len(self.orphan_member_tags)}): " + ", ".join(sorted(self.orphan_member_tags)))
+        if self.broken_clans:
+            lines.append(f"⚠️ Clans mit fehlenden Rollen/Kanälen ({len(self.broken_clans)}): " + ", ".join(sorted(self.broken_clans)))
+        return lines
+
+
+def _looks_like_clan_channel(channel) -> bool:
+    # Andere Kanäle in der Kategorie (z. B. Infos) bleiben unangetastet
+    if channel.name in CLAN_CHANNEL_NAMES:
+        return True
+    return any(CLAN_ROLE_REGEX.match(getattr(target, "name", "")) for target in channel.overwrites)
+
+
+def find_drift(guild, clans, member_tags, created_resources: dict, category_id: int, busy_tags=()) -> ClanDrift:
+    """Vergleicht Clan-Dokumente mit Rollen und Kanälen des Servers in einem Durchlauf.
+
+    `clans` sind alle Einträge aus clansettings, `member_tags` alle Tags aus clanmembers und
+    `created_resources` die vom Bot erstellten Rollen/Kanäle (ID -> Tag). Nur diese gelten als verwaist,
+    alles andere, das nur dem Namensschema entspricht, wird lediglich gemeldet.
+    Clans in `busy_tags` (z. B. gerade in Erstellung) werden nicht angefasst.
+    """
+    drift = ClanDrift()
+    busy_tags = set(busy_tags)
+
+    clan_tags = {clan["tag"] for clan in clans}
+    # Noch nicht akzeptierte Clans können Rollen haben, deren ID noch nicht gespeichert ist
+    protected_tags = busy_tags | {clan["tag"] for clan in clans if not clan.get("accepted")}
+    referenced_ids = {clan.get(key) for clan in clans for key in ROLE_KEYS + CHANNEL_KEYS} - {None}
+
+    role_ids = {role.id for role in guild.roles}
+    channel_ids = {channel.id for channel in guild.channels}
+
+    def classify(resource, looks_like_clan):
+        if resource.id in referenced_ids:
+            return None
+        if resource.id in created_resources:
+            return "orphan" if created_resources[resource.id] not in protected_tags else None
+        return "unverified" if looks_like_clan else None
+
+    for role in guild.roles:
+        if role.managed:
+            continue
+        match = CLAN_ROLE_REGEX.match(role.name)
+        kind = classify(role, bool(match) and match.group(1) == match.group(1).upper() and match.group(1) not in protected_tags)
+        if kind == "orphan":
+            drift.orphan_roles.append(role)
+        elif kind == "unverified":
+            drift.unverified_roles.append(role)
+
+    category = guild.get_channel(category_id)
+    if category is not None:
+        # Nur auf dem Clan-Server entscheiden, welche registrierten IDs nicht mehr existieren
+        drift.stale_resource_ids = set(created_resources) - role_ids - channel_ids
+    if category is not None and not busy_tags:
+        for channel in category.channels:
+            kind = classify(channel, _looks_like_clan_channel(channel))
+            if kind == "orphan":
+                drift.orphan_channels.append(channel)
+            elif kind == "unverified":
+                drift.unverified_channels.append(channel)
+
+    drift.orphan_member_tags = set(member_tags) - clan_tags
+
+    for clan in clans:
+        if not clan.get("accepted") or clan["tag"] in busy_tags:
+            continue
+        missing = [key for key in ROLE_KEYS if clan.get(key) not in role_ids]
+        missing += [key for key in CHANNEL_KEYS if clan.get(key) not in channel_ids]
+        if missing:
+            drift.broken_clans[clan["tag"]] = missing
+
+    return drift
+
+
+def plan_role_sync(guild, directory: dict, clan_members: dict):
+    """Berechnet für alle Mitglieder die fehlenden und überzähligen Clan-Rollen.
+
+    Soll-Zustand: Mitglieder haben die Member-Rolle ihres Clans, der Owner zusätzlich die Admin-Rolle.
+    Gibt {member: (hinzuzufügende Rollen, zu entfernende Rollen)} zurück.
+    """
+    changes = {}
+
+    def change(member_id, role, add):
+        member = guild.get_member(member_id)
+        if member is not None:
+            changes.setdefault(member, ([], []))[0 if add else 1].append(role)
+
+    for tag, clan in directory.items():
+        member_role = guild.get_role(clan.get("member_role_id") or 0)
+        admin_role = guild.get_role(clan.get("admin_role_id") or 0)
+        expected_members = clan_members.get(tag, set())
+        expected_admins = {clan["owner_id"]} & expected_members if clan.get("owner_id") else set()
+
+        for role, expected in ((member_role, expected_members), (admin_role, expected_admins)):
+            if role is None:
+                continue
+            actual = {member.id for member in role.members}
+            for member_id in expected - actual:
+                change(member_id, role, add=True)
+            for member_id in actual - expected:
+                change(member_id, role, add=False)
+    return changes
@@ -0,0 +1,200 @@
+import bisect
+import time
+
+# Zeitraum für Beitritts-/Austrittsraten (Tage)
+RATE_WINDOW_DAYS = 7
+
+
+def _today() -> int:
+    return int(time.time() // 86400)
+
+
+def _prune(daily: dict, today: int):
+    for day in [day for day in daily if day <= today - RATE_WINDOW_DAYS]:
+        del daily[day]
+
+
+class ClanCounters:
+    def __init__(self, tag: str, members: int = 0, joins: int = 0, leaves: int = 0, pending: int = 0, daily=None,
+                 voice_seconds: float = 0, voice_daily=None):
+        self.tag = tag
+        self.members = members
+        self.joins = joins
+        self.leaves = leaves
+        self.pending = pending
+        # Tag (Tage seit Epoch) -> [Beitritte, Austritte], nur die letzten RATE_WINDOW_DAYS Tage
+        self.daily = {int(day): list(values) for day, values in (daily or {}).items()}
+        # Sekunden in Clan-Sprachkanälen (Personen × Zeit), gesamt und pro Tag
+        self.voice_seconds = voice_seconds
+        self.voice_daily = {int(day): seconds for day, seconds in (voice_daily or {}).items()}
+
+    def _bucket(self):
+        today = _today()
+        bucket = self.daily.get(today)
+        if bucket is None:
+            bucket = self.daily[today] = [0, 0]
+            _prune(self.daily, today)
+        return bucket
+
+    def add_voice(self, seconds: float):
+        today = _today()
+        if today not in self.voice_daily:
+            _prune(self.voice_daily, today)
+            self.voice_daily[today] = 0
+        self.voice_daily[today] += seconds
+        self.voice_seconds += seconds
+
+    def recent_voice(self) -> float:
+        since = _today() - RATE_WINDOW_DAYS
+        return sum(seconds for day, seconds in self.voice_daily.items() if day > since)
+
+    def rates(self):
+        """Beitritte und Austritte innerhalb der letzten RATE_WINDOW_DAYS Tage."""
+        since = _today() - RATE_WINDOW_DAYS
+        joins = sum(values[0] for day, values in self.daily.items() if day > since)
+        leaves = sum(values[1] for day, values in self.daily.items() if day > since)
+        return joins, leaves
+
+    def to_document(self):
+        return {
+            "tag": self.tag,
+            "members": self.members,
+            "joins": self.joins,
+            "leaves": self.leaves,
+            "pending": self.pending,
+            "daily": {str(day): values for day, values in self.daily.items()},
+            "voice_seconds": self.voice_seconds,
+            "voice_daily": {str(day): seconds for day, seconds in self.voice_daily.items()},
+        }
+
+
+class ClanStats:
+    """Inkrementell gepflegte Clan-Kennzahlen mit sortierter Rangliste nach Mitgliederzahl.
+
+    Die Zähler werden in O(1) aktualisiert; die Rangliste ist eine sortierte Liste aus
+    (-Mitglieder, Tag), die per bisect an der geänderten Stelle angepasst wird.
+    Geänderte Clans werden in `dirty` gesammelt und regelmäßig gespeichert.
+    """
+
+    def __init__(self):
+        self.clans = {}
+        self.ranking = []
+        self.dirty = set()
+
+    def load(self, documents, member_counts: dict, pending_counts: dict = None):
+        """Lädt gespeicherte Zähler; Mitgliederzahl und offene Anfragen kommen aus den Quelldaten."""
+        clans = {}
+        for doc in documents:
+            clans[doc["tag"]] = ClanCounters(
+                doc["tag"], doc.get("members", 0), doc.get("joins", 0), doc.get("leaves", 0),
+                doc.get("pending", 0), doc.get("daily"), doc.get("voice_seconds", 0), doc.get("voice_daily")
+            )
+        for tag, count in member_counts.items():
+            counters = clans.setdefault(tag, ClanCounters(tag))
+            if counters.members != count:
+                counters.members = count
+                self.dirty.add(tag)
+        if pending_counts is not None:
+            for tag, counters in clans.items():
+                pending = pending_counts.get(tag, 0)
+                if counters.pending != pending:
+                    counters.pending = pending
+                    self.dirty.add(tag)
+        self.clans = clans
+        self.ranking = sorted((-counters.members, tag) for tag, counters in clans.items())
+
+    def get(self, tag: str) -> ClanCounters:
+        counters = self.clans.get(tag)
+        if counters is None:
+            counters = self.clans[tag] = ClanCounters(tag)
+            bisect.insort(self.ranking, (0, tag))
+        return counters
+
+    def _set_members(self, counters: ClanCounters, members: int):
+        i = bisect.bisect_left(self.ranking, (-counters.members, counters.tag))
+        if i < len(self.ranking) and self.ranking[i] == (-counters.members, counters.tag):
+            del self.ranking[i]
+        counters.members = members
+        bisect.insort(self.ranking, (-members, counters.tag))
+
+    def member_joined(self, tag: str):
+        counters = self.get(tag)
+        self._set_members(counters, counters.members + 1)
+        counters.joins += 1
+        counters._bucket()[0] += 1
+        self.dirty.add(tag)
+
+    def member_left(self, tag: str):
+        counters = self.get(tag)
+        self._set_members(counters, max(0, counters.members - 1))
+        counters.leaves += 1
+        counters._bucket()[1] += 1
+        self.dirty.add(tag)
+
+    def change_pending(self, tag: str, delta: int):
+        counters = self.get(tag)
+        counters.pending = max(0, counters.pending + delta)
+        self.dirty.add(tag)
+
+    def add_voice(self, tag: str, seconds: float):
+        self.get(tag).add_voice(seconds)
+        self.dirty.add(tag)
+
+    def remove(self, tag: str):
+        counters = self.clans.pop(tag, None)
+        if counters is not None:
+            i = bisect.bisect_left(self.ranking, (-counters.members, tag))
+            if i < len(self.ranking) and self.ranking[i] == (-counters.members, tag):
+                del self.ranking[i]
+        self.dirty.discard(tag)
+
+    def top(self, limit: int, include=None):
+        """Die `limit` größten Clans; `include(tag)` kann z. B. nicht akzeptierte Clans ausblenden."""
+        result = []
+        for _, tag in self.ranking:
+            if include is None or include(tag):
+                result.append(self.clans[tag])
+                if len(result) >= limit:
+                    break
+        return result
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return [self.clans[tag].to_document() for tag in dirty if tag in self.clans]
+
+
+class VoiceSessions:
+    """Laufende Sprach-Sessions in Clan-Kanälen: channel_id -> [Personen, seit, Tag].
+
+    Bei jeder Änderung wird nur die Zeit seit der letzten Änderung (Personen × Sekunden) gutgeschrieben
+    und der Eintrag an Ort und Stelle angepasst; gespeichert wird über die regelmäßige Statistik-Sicherung.
+    """
+
+    def __init__(self, stats: ClanStats):
+        self.stats = stats
+        self.sessions = {}
+
+    def _settle(self, session, now: float):
+        if session[0] > 0 and now > session[1]:
+            self.stats.add_voice(session[2], session[0] * (now - session[1]))
+        session[1] = now
+
+    def change(self, channel_id: int, tag: str, delta: int, now: float):
+        session = self.sessions.get(channel_id)
+        if session is None:
+            if delta > 0:
+                self.sessions[channel_id] = [delta, now, tag]
+            return
+        self._settle(session, now)
+        session[0] += delta
+        if session[0] <= 0:
+            del self.sessions[channel_id]
+
+    def settle_all(self, now: float):
+        for session in self.sessions.values():
+            self._settle(session, now)
+
+    def reset(self, occupancy, now: float):
+        """Übernimmt den aktuellen Stand aus (channel_id, Tag, Personen)-Einträgen, z. B. nach einem Reconnect."""
+        self.settle_all(now)
+        self.sessions = {channel_id: [count, now, tag] for channel_id, tag, count in occupancy if count > 0}
@@ -1,23 +1,63 @@
+import asyncio
+import bisect
+import datetime
 import discord
-from discord.ext import commands
-from discord import ui, Interaction
+from discord.ext import commands, tasks
+from discord import app_commands, ui, Interaction
 import motor.motor_asyncio as motor
+from pymongo import ASCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 import time
 import re
 import os
 import dotenv
 
+from clan_stats import RATE_WINDOW_DAYS, ClanStats, VoiceSessions
+from clan_reconcile import CHANNEL_KEYS, ROLE_KEYS, find_drift, plan_role_sync
+from ratelimit import RateLimitedQueue, TokenBucket
+
 dotenv.load_dotenv()
 
 MONGODB_URI = os.getenv("MONGO_URI")
 DB_NAME = "serverdata"
 CLAN_SETTINGS_COLLECTION = "clansettings"
 CLAN_MEMBERS_COLLECTION = "clanmembers"
+CLAN_STATS_COLLECTION = "clanstats"
+CLAN_JOIN_REQUESTS_COLLECTION = "clanjoinrequests"
+# Vom Bot erstellte Clan-Rollen und -Kanäle; nur diese darf der Abgleich löschen
+CLAN_RESOURCES_COLLECTION = "clanresources"
 
 ADMIN_CHANNEL_ID = 1450524445541142580
 CLAN_PARENT_CATEGORY_ID = 1451266582818062348
 
 HEX_COLOR_REGEX = r"^#[0-9A-Fa-f]{6}$"
+# Clan-Tag aus der Beschreibung des Antrags ("**Name [TAG]**"), für Buttons nach einem Neustart
+APPLICATION_TAG_REGEX = r"\[([^\[\]]+)\]\*\*$"
+
+CLAN_CHANNEL_CATEGORY_ID = 1468687460509945957
+GUILD_MEMBER_ROLE_ID = 1447150040039817450
+
+# Felder, die im Clan-Verzeichnis (Cache der akzeptierten Clans) gehalten werden
+DIRECTORY_PROJECTION = {
+    "_id": 0, "tag": 1, "name": 1, "desc": 1, "color": 1, "approval_required": 1, "owner_id": 1, "accepted": 1,
+    "admin_role_id": 1, "member_role_id": 1, "main_channel_id": 1, "voice_channel_id": 1
+}
+# Clans pro Seite im Beitritts-Browser (Maximum eines Select-Menüs)
+BROWSER_PAGE_SIZE = 25
+# Das Verzeichnis wird zusätzlich zur Aktualisierung bei Schreibzugriffen regelmäßig neu geladen (Sekunden)
+DIRECTORY_TTL = 600
+# Intervall, in dem geänderte Clan-Statistiken gespeichert werden (Sekunden)
+STATS_FLUSH_INTERVAL = 60
+LEADERBOARD_SIZE = 10
+# Beitrittsanfragen pro User: 1 Anfrage alle 5 Minuten, höchstens 3 auf einmal
+JOIN_REQUEST_RATE = 1 / 300
+JOIN_REQUEST_BURST = 3
+# Offene Beitrittsanfragen verfallen nach dieser Zeit (Sekunden, TTL-Index in MongoDB)
+JOIN_REQUEST_TTL = 14 * 86400
+# Anfragen ohne gesendete Nachricht (Absturz beim Senden) werden beim Start nach dieser Zeit entfernt (Sekunden)
+JOIN_REQUEST_SEND_GRACE = 60
+# Intervall des automatischen Abgleichs zwischen MongoDB und Server (Sekunden)
+RECONCILE_INTERVAL = 6 * 3600
 
 class ClanDB:
     def __init__(self):
@@ -25,6 +65,158 @@ class ClanDB:
         self.db = self.client[DB_NAME]
         self.settings = self.db[CLAN_SETTINGS_COLLECTION]
         self.members = self.db[CLAN_MEMBERS_COLLECTION]
+        self.stats_collection = self.db[CLAN_STATS_COLLECTION]
+        self.join_requests = self.db[CLAN_JOIN_REQUESTS_COLLECTION]
+        self.resources = self.db[CLAN_RESOURCES_COLLECTION]
+        self.stats = ClanStats()
+        self.voice = VoiceSessions(self.stats)
+        # tag -> kompakter Clan-Eintrag, nur akzeptierte Clans
+        self.directory = {}
+        # Sortierte Tags des Verzeichnisses für Keyset-Paginierung
+        self.directory_tags = []
+        # Sprachkanal-ID -> Tag
+        self.voice_channels = {}
+        # Umgekehrte Indizes für Mitgliedschaftsprüfungen ohne MongoDB-Zugriff
+        self.user_clans = {}
+        # Owner-ID -> Tags (ein Owner kann neben seinem Clan noch einen offenen Antrag haben)
+        self.owner_clans = {}
+        self.clan_members = {}
+
+    async def load_membership_index(self):
+        user_clans = {}
+        clan_members = {}
+        async for doc in self.members.find({}, {"_id": 0, "tag": 1, "members": 1}):
+            members = set(doc.get("members", ()))
+            clan_members[doc["tag"]] = members
+            for user_id in members:
+                user_clans[user_id] = doc["tag"]
+
+        owner_clans = {}
+        async for doc in self.settings.find({}, {"_id": 0, "tag": 1, "owner_id": 1}):
+            owner_clans.setdefault(doc["owner_id"], set()).add(doc["tag"])
+
+        self.user_clans = user_clans
+        self.clan_members = clan_members
+        self.owner_clans = owner_clans
+        print(f"✅ Clan-Index geladen: {len(user_clans)} Mitglieder in {len(clan_members)} Clans.")
+
+    async def load_stats(self, pending_requests=None):
+        documents = await self.stats_collection.find({}, {"_id": 0}).to_list(length=None)
+        pending_counts = None
+        if pending_requests is not None:
+            pending_counts = {}
+            for request in pending_requests:
+                pending_counts[request["tag"]] = pending_counts.get(request["tag"], 0) + 1
+        self.stats.load(documents, {tag: len(members) for tag, members in self.clan_members.items()}, pending_counts)
+
+    async def flush_stats(self):
+        self.voice.settle_all(time.time())
+        documents = self.stats.take_dirty()
+        if not documents:
+            return
+        try:
+            await self.stats_collection.bulk_write(
+                [UpdateOne({"tag": doc["tag"]}, {"$set": doc}, upsert=True) for doc in documents],
+                ordered=False
+            )
+        except Exception:
+            # Beim nächsten Durchlauf erneut versuchen
+            self.stats.dirty.update(doc["tag"] for doc in documents)
+            raise
+
+    async def refresh_directory(self):
+        directory = {}
+        async for clan in self.settings.find({"accepted": True}, DIRECTORY_PROJECTION):
+            directory[clan["tag"]] = clan
+        self.directory = directory
+        self.directory_tags = sorted(directory)
+        self.voice_channels = {clan["voice_channel_id"]: tag for tag, clan in directory.items() if clan.get("voice_channel_id")}
+
+    def _patch_directory(self, clan):
+        if not clan:
+            return
+        if clan.get("accepted"):
+            previous = self.directory.get(clan["tag"])
+            if previous is None:
+                bisect.insort(self.directory_tags, clan["tag"])
+            else:
+                self.voice_channels.pop(previous.get("voice_channel_id"), None)
+            self.directory[clan["tag"]] = {key: clan[key] for key in DIRECTORY_PROJECTION if key in clan}
+            if clan.get("voice_channel_id"):
+                self.voice_channels[clan["voice_channel_id"]] = clan["tag"]
+        else:
+            self._drop_from_directory(clan["tag"])
+
+    def _drop_from_directory(self, clan_tag):
+        clan = self.directory.pop(clan_tag, None)
+        if clan is not None:
+            self.voice_channels.pop(clan.get("voice_channel_id"), None)
+            i = bisect.bisect_left(self.directory_tags, clan_tag)
+            if i < len(self.directory_tags) and self.directory_tags[i] == clan_tag:
+                del self.directory_tags[i]
+
+    def browse_clans(self, after=None, before=None, query=None, limit=BROWSER_PAGE_SIZE):
+        """Eine Seite akzeptierter Clans nach Tag sortiert (Keyset: nach `after` bzw. vor `before`).
+
+        `query` filtert nach Teilstrings in Name oder Tag.
+        """
+        tags = self.directory_tags
+        query = query.casefold() if query else None
+        if before is not None:
+            positions = range(bisect.bisect_left(tags, before) - 1, -1, -1)
+        else:
+            positions = range(bisect.bisect_right(tags, after) if after is not None else 0, len(tags))
+
+        page = []
+        for i in positions:
+            clan = self.directory[tags[i]]
+            if query and query not in clan["tag"].casefold() and query not in clan["name"].casefold():
+                continue
+            page.append(clan)
+            if len(page) >= limit:
+                break
+        if before is not None:
+            page.reverse()
+        return page
+
+    async def ensure_indexes(self):
+        """Legt die Indizes pro Collection an; schlägt einer der eindeutigen Indizes fehl, wird abgebrochen.
+
+        Anlegen der Clans und Beitrittsanfragen verlassen sich auf tag_unique bzw. tag_user_unique.
+        """
+        indexes = [
+            (self.settings, True, [
+                IndexModel([("tag", ASCENDING)], unique=True, name="tag_unique"),
+                IndexModel([("owner_id", ASCENDING)], name="owner_id"),
+                IndexModel([("accepted", ASCENDING)], partialFilterExpression={"accepted": True}, name="accepted_partial"),
+            ]),
+            (self.members, False, [
+                IndexModel([("tag", ASCENDING)], unique=True, name="tag_unique"),
+                # Multikey-Index, da "members" ein Array ist
+                IndexModel([("members", ASCENDING)], name="members"),
+            ]),
+            (self.stats_collection, False, [
+                IndexModel([("tag", ASCENDING)], unique=True, name="tag_unique"),
+            ]),
+            (self.join_requests, True, [
+                IndexModel([("tag", ASCENDING), ("user_id", ASCENDING)], unique=True, name="tag_user_unique"),
+                IndexModel([("created_at", ASCENDING)], expireAfterSeconds=JOIN_REQUEST_TTL, name="created_at_ttl"),
+            ]),
+            (self.resources, False, [
+                IndexModel([("clan_id", ASCENDING), ("key", ASCENDING)], name="clan_key"),
+            ]),
+        ]
+        failed = []
+        for collection, required, models in indexes:
+            try:
+                await collection.create_indexes(models)
+            except Exception as e:
+                print(f"❌ Fehler beim Erstellen der MongoDB Indizes für '{collection.name}': {e}")
+                if required:
+                    failed.append(collection.name)
+        if failed:
+            raise RuntimeError(f"Eindeutige Clan-Indizes fehlen: {', '.join(failed)}")
+        print("✅ MongoDB Indizes für Clans erstellt/bestätigt.")
 
     async def get_clan(self, clan_tag=None, owner_id=None):
         query = {}
@@ -34,18 +226,115 @@ class ClanDB:
             query["owner_id"] = owner_id
         return await self.settings.find_one(query)
 
-    async def get_user_clan(self, user_id: int):
-        return await self.members.find_one({"members": user_id})
+    def get_user_clan(self, user_id: int):
+        """Tag des Clans, in dem der User Mitglied ist (oder None)."""
+        return self.user_clans.get(user_id)
+
+    def is_owner(self, user_id: int):
+        return user_id in self.owner_clans
 
-    async def is_owner(self, user_id: int):
-        return await self.settings.find_one({"owner_id": user_id}) is not None
+    def expected_role_ids(self, user_id: int):
+        """IDs der Clan-Rollen, die der User laut Mitgliederindex haben sollte."""
+        clan = self.directory.get(self.user_clans.get(user_id))
+        if not clan:
+            return []
+        role_ids = [clan.get("member_role_id")]
+        if clan.get("owner_id") == user_id:
+            role_ids.append(clan.get("admin_role_id"))
+        return [role_id for role_id in role_ids if role_id]
 
     async def delete_clan(self, clan_tag: str):
         await self.settings.delete_one({"tag": clan_tag})
         await self.members.delete_one({"tag": clan_tag})
+        await self.stats_collection.delete_one({"tag": clan_tag})
+        await self.join_requests.delete_many({"tag": clan_tag})
+        self.stats.remove(clan_tag)
+        self._drop_from_directory(clan_tag)
+        for user_id in self.clan_members.pop(clan_tag, ()):
+            if self.user_clans.get(user_id) == clan_tag:
+                del self.user_clans[user_id]
+        for owner_id in [owner_id for owner_id, tags in self.owner_clans.items() if clan_tag in tags]:
+            self.owner_clans[owner_id].discard(clan_tag)
+            if not self.owner_clans[owner_id]:
+                del self.owner_clans[owner_id]
+
+    async def create_join_request(self, clan_tag, user_id) -> bool:
+        """Legt eine offene Beitrittsanfrage an; False, wenn es schon eine gibt (eindeutiger Index)."""
+        try:
+            await self.join_requests.insert_one({
+                "tag": clan_tag,
+                "user_id": user_id,
+                "channel_id": None,
+                "message_id": None,
+                "created_at": discord.utils.utcnow()
+            })
+        except DuplicateKeyError:
+            return False
+        self.stats.change_pending(clan_tag, 1)
+        return True
 
+    async def has_join_request(self, clan_tag, user_id) -> bool:
+        return await self.join_requests.count_documents({"tag": clan_tag, "user_id": user_id}, limit=1) > 0
 
+    async def set_join_request_message(self, clan_tag, user_id, message: discord.Message):
+        await self.join_requests.update_one(
+            {"tag": clan_tag, "user_id": user_id},
+            {"$set": {"channel_id": message.channel.id, "message_id": message.id}}
+        )
+
+    async def close_join_request(self, clan_tag, user_id) -> bool:
+        """Entfernt die Anfrage; False, wenn sie bereits bearbeitet wurde."""
+        result = await self.join_requests.delete_one({"tag": clan_tag, "user_id": user_id})
+        if not result.deleted_count:
+            return False
+        self.stats.change_pending(clan_tag, -1)
+        return True
+
+    async def record_resource(self, clan, key, resource):
+        """Merkt sich eine vom Bot erstellte Rolle bzw. einen Kanal, damit der Abgleich ihn später löschen darf."""
+        await self.resources.update_one(
+            {"_id": resource.id},
+            {"$set": {"tag": clan["tag"], "clan_id": clan["_id"], "key": key, "created": time.time()}},
+            upsert=True
+        )
 
+    async def find_resource_id(self, clan, key):
+        """ID der Ressource, die für genau dieses Clan-Dokument unter `key` erstellt wurde (oder None)."""
+        doc = await self.resources.find_one({"clan_id": clan["_id"], "key": key}, {"_id": 1})
+        return doc["_id"] if doc else None
+
+    async def forget_resources(self, resource_ids):
+        await self.resources.delete_many({"_id": {"$in": list(resource_ids)}})
+
+    async def get_reconcile_state(self):
+        """Alle Clan-Einträge (nur relevante Felder), alle Tags mit Mitgliederliste und die vom Bot erstellten Ressourcen."""
+        projection = {"_id": 0, "tag": 1, "accepted": 1, **{key: 1 for key in ROLE_KEYS + CHANNEL_KEYS}}
+        clans = await self.settings.find({}, projection).to_list(length=None)
+        member_tags = await self.members.distinct("tag")
+        created_resources = {doc["_id"]: doc["tag"] async for doc in self.resources.find({}, {"tag": 1})}
+        return clans, member_tags, created_resources
+
+    async def delete_orphan_documents(self, clan_tags):
+        """Entfernt Mitgliederlisten, Statistiken und Anfragen von Clans ohne Einstellungen."""
+        clan_tags = list(clan_tags)
+        query = {"tag": {"$in": clan_tags}}
+        await self.members.delete_many(query)
+        await self.stats_collection.delete_many(query)
+        await self.join_requests.delete_many(query)
+        for clan_tag in clan_tags:
+            self.stats.remove(clan_tag)
+            for user_id in self.clan_members.pop(clan_tag, ()):
+                if self.user_clans.get(user_id) == clan_tag:
+                    del self.user_clans[user_id]
+
+    async def delete_unsent_join_requests(self) -> int:
+        """Entfernt Anfragen, deren Nachricht nie gespeichert wurde; sie hätten keine Buttons und würden den User blockieren."""
+        cutoff = discord.utils.utcnow() - datetime.timedelta(seconds=JOIN_REQUEST_SEND_GRACE)
+        result = await self.join_requests.delete_many({"message_id": None, "created_at": {"$lt": cutoff}})
+        return result.deleted_count
+
+    async def get_join_requests(self):
+        return await self.join_requests.find({}, {"_id": 0}).to_list(length=None)
 
     async def add_member(self, clan_tag, user_id):
         await self.members.update_one(
@@ -53,21 +342,56 @@ class ClanDB:
             {"$addToSet": {"members": user_id}},
             upsert=True
         )
+        members = self.clan_members.setdefault(clan_tag, set())
+        if user_id not in members:
+            members.add(user_id)
+            self.stats.member_joined(clan_tag)
+        self.user_clans[user_id] = clan_tag
 
     async def remove_member(self, clan_tag, user_id):
         await self.members.update_one(
             {"tag": clan_tag},
             {"$pull": {"members": user_id}}
         )
+        members = self.clan_members.get(clan_tag, set())
+        if user_id in members:
+            members.discard(user_id)
+            self.stats.member_left(clan_tag)
+        if self.user_clans.get(user_id) == clan_tag:
+            del self.user_clans[user_id]
+
+    async def insert_clan(self, data) -> bool:
+        """Legt den Clan an; False, wenn der Tag schon vergeben ist (eindeutiger Index)."""
+        try:
+            await self.settings.insert_one(data)
+        except DuplicateKeyError:
+            return False
+        self.owner_clans.setdefault(data["owner_id"], set()).add(data["tag"])
+        self._patch_directory(data)
+        return True
 
-    async def insert_clan(self, data):
-        await self.settings.insert_one(data)
+    async def checkpoint_clan(self, clan_tag, data, unset=()):
+        """Speichert einen abgeschlossenen Schritt der Clan-Erstellung im Clan-Dokument."""
+        update = {"$set": data}
+        if unset:
+            update["$unset"] = {field: "" for field in unset}
+        clan = await self.settings.find_one_and_update(
+            {"tag": clan_tag},
+            update,
+            projection=DIRECTORY_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        self._patch_directory(clan)
+        return clan
 
     async def update_clan(self, owner_id, data):
-        await self.settings.update_one({"owner_id": owner_id}, {"$set": data})
-
-    async def get_all_accepted(self):
-        return await self.settings.find({"accepted": True}).to_list(None)
+        clan = await self.settings.find_one_and_update(
+            {"owner_id": owner_id},
+            {"$set": data},
+            projection=DIRECTORY_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        self._patch_directory(clan)
 
 class ClanCreationModal(ui.Modal, title="⚔️ Clan erstellen"):
     def __init__(self, db: ClanDB):
@@ -100,12 +424,6 @@ class ClanCreationModal(ui.Modal, title="⚔️ Clan erstellen"):
 
         tag = self.tag.value.upper()
 
-        if await self.db.get_clan(clan_tag=tag):
-            return await interaction.response.send_message(
-                f"❌ Der Clan-Tag **{tag}** ist bereits vergeben.",
-                ephemeral=True
-            )
-
         data = {
             "name": self.name.value,
             "tag": tag,
@@ -117,7 +435,11 @@ class ClanCreationModal(ui.Modal, title="⚔️ Clan erstellen"):
             "accepted": False
         }
 
-        await self.db.insert_clan(data)
+        if not await self.db.insert_clan(data):
+            return await interaction.response.send_message(
+                f"❌ Der Clan-Tag **{tag}** ist bereits vergeben.",
+                ephemeral=True
+            )
 
         embed = discord.Embed(
             title="📥 Neuer Clan-Antrag",
@@ -245,32 +567,25 @@ class ClanEditView(ui.View):
         if not clan:
             return
 
-        guild = interaction.guild
-
-        admin_role = guild.get_role(clan.get("admin_role_id"))
-        member_role = guild.get_role(clan.get("member_role_id"))
-        main_channel = guild.get_channel(clan.get("main_channel_id"))
-        voice_channel = guild.get_channel(clan.get("voice_channel_id"))
-
+        await interaction.response.edit_message(content="ℹ️ **Clan wird gelöscht...**", view=None)
 
-        if admin_role:
-            await admin_role.delete()
-
-        if member_role:
-            await member_role.delete()
-
-        if main_channel:
-            await main_channel.delete()
-
-        if voice_channel:
-            await voice_channel.delete()
-
-        await self.db.delete_clan(clan["tag"])
-
-        await interaction.response.edit_message(
-            content="🗑️ **Der Clan wurde vollständig gelöscht.**",
-            view=None
+        failed = await delete_clan_resources(
+            clan_request_queue(interaction.client), interaction.guild, clan, reason="Clan gelöscht"
         )
+        try:
+            await self.db.delete_clan(clan["tag"])
+        except Exception as e:
+            print(f"❌ Fehler beim Löschen des Clans {clan['tag']}: {e}")
+            return await interaction.edit_original_response(
+                content="❌ **Der Clan konnte nicht gelöscht werden.** Bitte versuche es erneut oder wende dich an den Support."
+            )
+
+        if failed:
+            content = (f"🗑️ **Der Clan wurde gelöscht.**\n{failed} Rolle(n)/Kanal/Kanäle konnten nicht entfernt werden "
+                       "und werden beim nächsten Abgleich automatisch bereinigt.")
+        else:
+            content = "🗑️ **Der Clan wurde vollständig gelöscht.**"
+        await interaction.edit_original_response(content=content)
 
 class ConfirmDeleteView(ui.View):
     def __init__(self, parent_view):
@@ -305,10 +620,13 @@ class Reasonform(discord.ui.Modal, title="Ablehnung"):
     )
 
     async def on_submit(self, interaction: discord.Interaction):
-        clan_tag = self.tag
         reason = self.reason.value
-        message = self.message
         clan = await self.db.get_clan(clan_tag=self.tag)
+        if not clan:
+            return await interaction.response.send_message(f"ℹ️ **Clan `{self.tag}` existiert nicht mehr.**", ephemeral=True)
+        if self.tag in _clans_in_provisioning:
+            return await interaction.response.send_message("ℹ️ **Dieser Clan wird gerade erstellt.**", ephemeral=True)
+        await interaction.response.defer()
         owner = interaction.guild.get_member(clan["owner_id"])
 
         embed = discord.Embed(
@@ -319,73 +637,178 @@ class Reasonform(discord.ui.Modal, title="Ablehnung"):
 
         embed.add_field(name="Grund", value=reason, inline=False)
 
+        if owner:
+            try:
+                await owner.send(embed=embed, content=owner.mention)
+            except discord.Forbidden:
+                pass
+
+        # Ein abgebrochener Erstellungsversuch kann bereits Rollen oder Kanäle angelegt haben
+        await delete_clan_resources(clan_request_queue(interaction.client), interaction.guild, clan, reason="Clan abgelehnt")
         try:
-            await owner.send(embed=embed, content=owner.mention)
-        except discord.Forbidden:
-            pass
+            await self.db.delete_clan(self.tag)
+        except Exception as e:
+            print(f"❌ Fehler beim Löschen des Clans {self.tag}: {e}")
+            return await interaction.followup.send("❌ **Der Clan konnte nicht gelöscht werden.**", ephemeral=True)
 
         await self.message.edit(content=f"❌ Clan aus folgendem Grund abgelehnt:\n\n {reason}", view=None)
 
-        await self.db.delete_clan(self.tag)
+def clan_request_queue(client) -> RateLimitedQueue:
+    return client.get_cog("ClanCog").request_queue
 
-class ClanApprovalView(ui.View):
-    def __init__(self, db: ClanDB, tag: str):
-        super().__init__(timeout=None)
-        self.db = db
-        self.tag = tag
 
-    @ui.button(label="✅ Akzeptieren", style=discord.ButtonStyle.green, custom_id="clan:approval")
-    async def approve(self, interaction: discord.Interaction, button: ui.Button):
-        await interaction.message.edit(content="ℹ️ **Clan wird erstellt...**")
+async def delete_clan_resources(queue: RateLimitedQueue, guild: discord.Guild, clan: dict, reason: str) -> int:
+    """Löscht Rollen und Kanäle eines Clans über die gedrosselte Warteschlange; gibt die Anzahl der Fehler zurück."""
+    futures = []
+    for key in ROLE_KEYS:
+        role = guild.get_role(clan.get(key) or 0)
+        if role:
+            futures.append(queue.submit("role_delete", lambda role=role: role.delete(reason=reason)))
+    for key in CHANNEL_KEYS:
+        channel = guild.get_channel(clan.get(key) or 0)
+        if channel:
+            futures.append(queue.submit("channel_delete", lambda channel=channel: channel.delete(reason=reason)))
+
+    failed = 0
+    for result in await asyncio.gather(*futures, return_exceptions=True):
+        if isinstance(result, Exception) and not isinstance(result, discord.NotFound):
+            print(f"❌ Fehler beim Löschen einer Ressource von Clan {clan['tag']}: {result}")
+            failed += 1
+    return failed
+
+
+async def provision_clan(db: ClanDB, guild: discord.Guild, clan: dict):
+    """Erstellt Rollen und Kanäle eines Clans als fortsetzbare Saga.
+
+    Jeder abgeschlossene Schritt wird sofort im Clan-Dokument gespeichert. Bricht die Erstellung ab
+    (Neustart, Rate-Limit, Fehler), werden beim nächsten Versuch nur die fehlenden Schritte ausgeführt.
+    Gibt den Owner zurück (None, wenn er nicht mehr auf dem Server ist).
+    """
+    tag = clan["tag"]
+
+    async def ensure_resource(key, lookup, candidates, create):
+        resource = lookup(clan.get(key) or 0)
+        if resource is not None:
+            return resource
+
+        # Der Checkpoint fehlt: nur übernehmen, was nachweislich für dieses Clan-Dokument erstellt wurde
+        resource = lookup(await db.find_resource_id(clan, key) or 0)
+        pending_since = clan.get("pending", {}).get(key)
+        if resource is None and pending_since is not None:
+            # Absturz zwischen Erstellen und Registrieren: nur, was seit dem Start dieses Schritts entstanden ist
+            # (60 s Toleranz für die Uhr)
+            resource = discord.utils.find(lambda r: r.created_at.timestamp() >= pending_since - 60, candidates())
+            if resource is not None:
+                await db.record_resource(clan, key, resource)
+        if resource is None:
+            await db.checkpoint_clan(tag, {f"pending.{key}": time.time()})
+            resource = await create()
+            await db.record_resource(clan, key, resource)
+        await db.checkpoint_clan(tag, {key: resource.id}, unset=[f"pending.{key}"])
+        return resource
+
+    def ensure_role(key, name, **kwargs):
+        return ensure_resource(
+            key, guild.get_role,
+            # Eine frisch erstellte Rolle hat noch keine Mitglieder
+            lambda: [role for role in guild.roles if role.name == name and not role.members],
+            lambda: guild.create_role(name=name, **kwargs)
+        )
 
-        clan = await self.db.get_clan(clan_tag=self.tag)
-        guild = interaction.guild
+    admin_role, member_role = await asyncio.gather(
+        ensure_role("admin_role_id", f"{tag}-Admin", color=discord.Color.from_str(clan["color"])),
+        ensure_role("member_role_id", f"{tag}-Member"),
+    )
 
-        admin_role = await guild.create_role(
-            name=f"{self.tag}-Admin",
-            color=discord.Color.from_str(clan["color"])
+    guild_member_role = guild.get_role(GUILD_MEMBER_ROLE_ID)
+    category = guild.get_channel(CLAN_CHANNEL_CATEGORY_ID)
+
+    hidden = discord.PermissionOverwrite(view_channel=False)
+    text_overwrites = {
+        guild.default_role: hidden,
+        admin_role: discord.PermissionOverwrite(send_messages=True, manage_channels=True, manage_messages=True),
+        member_role: discord.PermissionOverwrite(send_messages=True),
+    }
+    voice_overwrites = {
+        guild.default_role: hidden,
+        admin_role: discord.PermissionOverwrite(connect=True, speak=True, manage_channels=True, manage_messages=True),
+        member_role: discord.PermissionOverwrite(connect=True, speak=True),
+    }
+    if guild_member_role:
+        text_overwrites[guild_member_role] = hidden
+        voice_overwrites[guild_member_role] = hidden
+
+    def ensure_channel(key, channel_type, factory):
+        return ensure_resource(
+            key, guild.get_channel,
+            lambda: [c for c in category.channels if isinstance(c, channel_type) and member_role in c.overwrites],
+            factory
         )
-        member_role = await guild.create_role(name=f"{self.tag}-Member")
-        guild_member_role = guild.get_role(1447150040039817450)
 
-        category = discord.utils.get(guild.categories, id=1468687460509945957)
+    await asyncio.gather(
+        ensure_channel("main_channel_id", discord.TextChannel,
+                       lambda: category.create_text_channel("💬-chat", overwrites=text_overwrites)),
+        ensure_channel("voice_channel_id", discord.VoiceChannel,
+                       lambda: category.create_voice_channel("🔊 Voice", overwrites=voice_overwrites)),
+    )
 
-        main_channel = await category.create_text_channel("💬-chat")
-        voice_channel = await category.create_voice_channel("🔊 Voice")
+    owner = guild.get_member(clan["owner_id"])
+    steps = [db.add_member(tag, clan["owner_id"])]
+    if owner:
+        steps.append(owner.add_roles(admin_role, member_role))
+    await asyncio.gather(*steps)
 
-        admin_perms_tc = discord.PermissionOverwrite(send_messages=True, manage_channels=True, manage_messages=True)
-        member_perms_tc = discord.PermissionOverwrite(send_messages=True)
-        others_perms_tc = discord.PermissionOverwrite(view_channel=False)
-        admin_perms_vc = discord.PermissionOverwrite(connect=True, speak=True, manage_channels=True, manage_messages=True)
-        member_perms_vc = discord.PermissionOverwrite(connect=True, speak=True)
-        others_perms_vc = discord.PermissionOverwrite(view_channel=False)
+    # Erst ganz zum Schluss sichtbar machen (Verzeichnis, Beitritt)
+    await db.checkpoint_clan(tag, {"accepted": True})
+    return owner
 
-        await main_channel.set_permissions(admin_role, overwrite=admin_perms_tc)
-        await main_channel.set_permissions(member_role, overwrite=member_perms_tc)
-        await main_channel.set_permissions(guild.default_role, overwrite=others_perms_tc)
-        await main_channel.set_permissions(guild_member_role, overwrite=others_perms_vc)
 
-        await voice_channel.set_permissions(admin_role, overwrite=admin_perms_vc)
-        await voice_channel.set_permissions(member_role, overwrite=member_perms_vc)
-        await voice_channel.set_permissions(guild.default_role, overwrite=others_perms_vc)
-        await voice_channel.set_permissions(guild_member_role, overwrite=others_perms_vc)
+# Clan-Tags, deren Erstellung gerade läuft (verhindert doppelte Rollen bei Doppelklick)
+_clans_in_provisioning = set()
 
-        owner = guild.get_member(clan["owner_id"])
-        await owner.add_roles(admin_role, member_role)
 
-        await self.db.update_clan(clan["owner_id"], {
-            "accepted": True,
-            "admin_role_id": admin_role.id,
-            "member_role_id": member_role.id,
-            "main_channel_id": main_channel.id,
-            "voice_channel_id": voice_channel.id
-        })
+class ClanApprovalView(ui.View):
+    def __init__(self, db: ClanDB, tag: str = None):
+        super().__init__(timeout=None)
+        self.db = db
+        self.tag = tag
 
-        await self.db.add_member(self.tag, clan["owner_id"])
+    def resolve_tag(self, message: discord.Message):
+        if self.tag:
+            return self.tag
+        if message and message.embeds and message.embeds[0].description:
+            match = re.search(APPLICATION_TAG_REGEX, message.embeds[0].description)
+            if match:
+                return match.group(1)
+        return None
 
-        await interaction.message.edit(
-            content=f"✅ **Clan `{self.tag}` wurde erfolgreich erstellt.**", view=None
-        )
+    @ui.button(label="✅ Akzeptieren", style=discord.ButtonStyle.green, custom_id="clan:approval")
+    async def approve(self, interaction: discord.Interaction, button: ui.Button):
+        await interaction.response.defer()
+
+        tag = self.resolve_tag(interaction.message)
+        if not tag:
+            return await interaction.followup.send("❌ **Clan-Tag konnte nicht ermittelt werden.**", ephemeral=True)
+        if tag in _clans_in_provisioning:
+            return await interaction.followup.send("ℹ️ **Dieser Clan wird bereits erstellt.**", ephemeral=True)
+
+        _clans_in_provisioning.add(tag)
+        try:
+            clan = await self.db.get_clan(clan_tag=tag)
+            if not clan:
+                await interaction.edit_original_response(content=f"❌ **Clan `{tag}` existiert nicht mehr.**", view=None)
+                return
+            await interaction.edit_original_response(content="ℹ️ **Clan wird erstellt...**")
+            owner = await provision_clan(self.db, interaction.guild, clan)
+        except Exception as e:
+            print(f"❌ Fehler beim Erstellen des Clans {tag}: {e}")
+            await interaction.edit_original_response(
+                content=f"⚠️ **Clan `{tag}` konnte nicht vollständig erstellt werden.**\n"
+                        "Erneut auf Akzeptieren klicken, um an derselben Stelle fortzufahren."
+            )
+            return
+        finally:
+            _clans_in_provisioning.discard(tag)
 
         embed = discord.Embed(
             title="✅ Clan akzeptiert",
@@ -394,58 +817,145 @@ class ClanApprovalView(ui.View):
                         "Bei Problemen melde dich bitte an den Support von TradiaSMP. Vielen Dank!",
             color=discord.Color.green()
         )
-        try:
-            await owner.send(embed=embed, content=owner.mention)
-        except discord.Forbidden:
-            pass
+
+        async def notify_owner():
+            if owner is None:
+                return
+            try:
+                await owner.send(embed=embed, content=owner.mention)
+            except discord.Forbidden:
+                pass
+
+        await asyncio.gather(
+            interaction.edit_original_response(
+                content=f"✅ **Clan `{tag}` wurde erfolgreich erstellt.**", view=None
+            ),
+            notify_owner()
+        )
 
     @ui.button(label="❌ Ablehnen", style=discord.ButtonStyle.red, custom_id="clan:deny")
     async def deny(self, interaction: discord.Interaction, button: ui.Button):
         message = interaction.message
-        await interaction.response.send_modal(Reasonform(tag=self.tag, message=message, db=self.db))
+        await interaction.response.send_modal(Reasonform(tag=self.resolve_tag(message), message=message, db=self.db))
 
 class JoinRequestView(ui.View):
+    """Beitrittsanfrage im Clan-Kanal; wird beim Start anhand der gespeicherten Message-ID neu registriert."""
+
     def __init__(self, db: ClanDB, clan_tag: str, user_id: int):
-        super().__init__(timeout=86400)
+        super().__init__(timeout=None)
         self.db = db
         self.clan_tag = clan_tag
         self.user_id = user_id
 
-    @ui.button(label="✅ Annehmen", style=discord.ButtonStyle.green)
+    @ui.button(label="✅ Annehmen", style=discord.ButtonStyle.green, custom_id="clan:joinrequest:accept")
     async def accept(self, interaction: discord.Interaction, button: ui.Button):
-        clan = await self.db.get_clan(clan_tag=self.clan_tag)
         member = interaction.guild.get_member(self.user_id)
-        role = interaction.guild.get_role(clan["member_role_id"])
+        clan = self.db.directory.get(self.clan_tag) or await self.db.get_clan(clan_tag=self.clan_tag)
+
+        if not await self.db.close_join_request(self.clan_tag, self.user_id):
+            return await interaction.response.edit_message(content="ℹ️ **Diese Anfrage wurde bereits bearbeitet.**", view=None)
+        if member is None or clan is None:
+            return await interaction.response.edit_message(content="❌ **Der User ist nicht mehr auf dem Server.**", view=None)
+        if self.db.get_user_clan(self.user_id):
+            return await interaction.response.edit_message(
+                content=f"ℹ️ **{member.mention} ist inzwischen bereits Mitglied eines Clans.**", view=None
+            )
 
-        await member.add_roles(role)
+        role = interaction.guild.get_role(clan["member_role_id"])
+        if role:
+            await member.add_roles(role)
         await self.db.add_member(self.clan_tag, self.user_id)
 
-        await interaction.message.edit(
+        await interaction.response.edit_message(
             content=f"🎉 **{member.mention} wurde in den Clan aufgenommen!**",
             view=None
         )
 
-    @ui.button(label="❌ Ablehnen", style=discord.ButtonStyle.red)
+    @ui.button(label="❌ Ablehnen", style=discord.ButtonStyle.red, custom_id="clan:joinrequest:reject")
     async def reject(self, interaction: discord.Interaction, button: ui.Button):
-        await interaction.message.edit(
+        await self.db.close_join_request(self.clan_tag, self.user_id)
+        await interaction.response.edit_message(
             content="❌ **Die Beitrittsanfrage wurde abgelehnt.**",
             view=None
         )
 
+# user_id -> TokenBucket für Beitrittsanfragen
+_join_request_buckets = {}
+
+
+def join_request_allowed(user_id: int):
+    """Prüft das Anfrage-Limit des Users; gibt (erlaubt, Wartezeit in Sekunden) zurück."""
+    bucket = _join_request_buckets.get(user_id)
+    if bucket is None:
+        if len(_join_request_buckets) > 1000:
+            # Volle Buckets entsprechen einem frischen Bucket und können verworfen werden
+            for key in [key for key, b in _join_request_buckets.items() if b.retry_after() == 0 and b.tokens >= b.capacity]:
+                del _join_request_buckets[key]
+        bucket = _join_request_buckets[user_id] = TokenBucket(JOIN_REQUEST_RATE, JOIN_REQUEST_BURST)
+    if bucket.try_acquire():
+        return True, 0
+    return False, bucket.retry_after()
+
+class ClanSearchModal(ui.Modal, title="🔍 Clan suchen"):
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+
+    query = ui.TextInput(label="Name oder Tag", placeholder="Leer lassen, um alle Clans anzuzeigen", required=False, max_length=32)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        query = self.query.value.strip() or None
+        page = self.view.db.browse_clans(query=query)
+        if not page:
+            return await interaction.response.send_message(
+                f"ℹ️ **Keine Clans zu `{query}` gefunden.**",
+                ephemeral=True
+            )
+        self.view.query = query
+        self.view.show(page)
+        await self.view.update(interaction)
+
+
 class ClanJoinView(ui.View):
-    def __init__(self, db: ClanDB, clans):
+    """Blättert seitenweise durch das Clan-Verzeichnis.
+
+    Gehalten wird nur die aktuelle Seite (max. BROWSER_PAGE_SIZE Einträge aus dem geteilten Verzeichnis),
+    die Position ergibt sich aus dem ersten und letzten Tag der Seite.
+    """
+
+    def __init__(self, db: ClanDB, page, query=None):
         super().__init__(timeout=300)
         self.db = db
-        self.clans = clans
-        self.index = 0
+        self.query = query
+        self.page = []
+        self.selected = None
+        self.show(page)
+
+    def show(self, page):
+        self.page = page
+        self.selected = page[0]["tag"]
+        self.select_clan.options = [
+            discord.SelectOption(label=f"{c['name']} [{c['tag']}]"[:100], value=c["tag"], default=c["tag"] == self.selected)
+            for c in page
+        ]
+
+    def current(self):
+        return self.db.directory.get(self.selected)
 
     def embed(self):
-        c = self.clans[self.index]
-        return discord.Embed(
+        c = self.current()
+        if c is None:
+            return discord.Embed(title="ℹ️ Dieser Clan existiert nicht mehr.", color=discord.Color.greyple())
+        embed = discord.Embed(
             title=f"⚔️ {c['name']} [{c['tag']}]",
             description=c["desc"],
             color=discord.Color.from_str(c["color"])
         )
+        footer = f"Clans {self.page[0]['tag']} – {self.page[-1]['tag']}"
+        if self.query:
+            footer += f" · Suche: {self.query}"
+        embed.set_footer(text=footer)
+        return embed
 
     async def update(self, interaction: discord.Interaction):
         await interaction.response.edit_message(
@@ -453,40 +963,83 @@ class ClanJoinView(ui.View):
             view=self
         )
 
-    @ui.button(label="⬅️", style=discord.ButtonStyle.secondary)
+    @ui.select(placeholder="Clan auswählen", row=0)
+    async def select_clan(self, interaction: discord.Interaction, select: ui.Select):
+        self.selected = select.values[0]
+        for option in select.options:
+            option.default = option.value == self.selected
+        await self.update(interaction)
+
+    @ui.button(label="⬅️", style=discord.ButtonStyle.secondary, row=1)
     async def back(self, interaction: discord.Interaction, button: ui.Button):
-        if not self.clans:
-            return
-        self.index = (self.index - 1) % len(self.clans)
+        page = self.db.browse_clans(before=self.page[0]["tag"], query=self.query)
+        if not page:
+            # Am Anfang angekommen: zur letzten Seite springen
+            page = self.db.browse_clans(before=chr(0x10FFFF), query=self.query)
+        if page:
+            self.show(page)
         await self.update(interaction)
 
-    @ui.button(label="🤝 Clan beitreten", style=discord.ButtonStyle.green)
+    @ui.button(label="🤝 Clan beitreten", style=discord.ButtonStyle.green, row=1)
     async def join(self, interaction: discord.Interaction, button: ui.Button):
+        clan = self.current()
+        if clan is None:
+            return await interaction.response.send_message("ℹ️ Dieser Clan existiert nicht mehr.", ephemeral=True)
 
-        clans = await self.db.get_all_accepted()
-        if not clans:
-            return await interaction.response.send_message("ℹ️ Es gibt bisher keine Clans zum Beitreten.", ephemeral=True)
-
-        if await self.db.get_user_clan(interaction.user.id):
+        if self.db.get_user_clan(interaction.user.id):
             return await interaction.response.send_message(
                 "❌ **Du bist bereits Mitglied eines Clans.**",
                 ephemeral=True
             )
 
-        clan = self.clans[self.index]
-
         if clan["approval_required"]:
             channel = interaction.guild.get_channel(clan["main_channel_id"])
-            if channel:
-                embed = discord.Embed(
-                    title="📨 Neue Beitrittsanfrage",
-                    description=f"{interaction.user.mention} möchte dem Clan beitreten.",
-                    color=discord.Color.blue()
+            if channel is None:
+                return await interaction.response.send_message(
+                    "❌ **Der Kanal dieses Clans wurde nicht gefunden.**\nBitte wende dich an den Support.",
+                    ephemeral=True
+                )
+
+            already_requested = "ℹ️ **Du hast bereits eine offene Beitrittsanfrage an diesen Clan.**"
+            # Erst auf eine bestehende Anfrage prüfen, damit erneutes Klicken nicht das Anfrage-Limit verbraucht
+            if await self.db.has_join_request(clan["tag"], interaction.user.id):
+                return await interaction.response.send_message(already_requested, ephemeral=True)
+
+            allowed, retry_after = join_request_allowed(interaction.user.id)
+            if not allowed:
+                return await interaction.response.send_message(
+                    f"⏳ **Zu viele Beitrittsanfragen.** Bitte versuche es in {int(retry_after) + 1} Sekunden erneut.",
+                    ephemeral=True
                 )
-                await channel.send(
+
+            if not await self.db.create_join_request(clan["tag"], interaction.user.id):
+                return await interaction.response.send_message(already_requested, ephemeral=True)
+
+            embed = discord.Embed(
+                title="📨 Neue Beitrittsanfrage",
+                description=f"{interaction.user.mention} möchte dem Clan beitreten.",
+                color=discord.Color.blue()
+            )
+            message = None
+            try:
+                message = await channel.send(
                     embed=embed,
                     view=JoinRequestView(self.db, clan["tag"], interaction.user.id)
                 )
+                await self.db.set_join_request_message(clan["tag"], interaction.user.id, message)
+            except Exception as e:
+                # Ohne gespeicherte Nachricht könnte niemand die Anfrage bearbeiten: komplett zurücknehmen
+                print(f"❌ Fehler beim Senden der Beitrittsanfrage an Clan {clan['tag']}: {e}")
+                try:
+                    await self.db.close_join_request(clan["tag"], interaction.user.id)
+                    if message is not None:
+                        await message.delete()
+                except Exception as cleanup_error:
+                    print(f"❌ Fehler beim Zurücknehmen der Beitrittsanfrage an Clan {clan['tag']}: {cleanup_error}")
+                return await interaction.response.send_message(
+                    "❌ **Die Beitrittsanfrage konnte nicht gesendet werden.**\nBitte versuche es später erneut.",
+                    ephemeral=True
+                )
 
             return await interaction.response.send_message(
                 "⏳ **Deine Beitrittsanfrage wurde gesendet.**\nBitte warte auf eine Entscheidung der Clan-Leitung.",
@@ -503,13 +1056,20 @@ class ClanJoinView(ui.View):
             ephemeral=True
         )
 
-    @ui.button(label="➡️", style=discord.ButtonStyle.secondary)
+    @ui.button(label="➡️", style=discord.ButtonStyle.secondary, row=1)
     async def forward(self, interaction: discord.Interaction, button: ui.Button):
-        if not self.clans:
-            return
-        self.index = (self.index + 1) % len(self.clans)
+        page = self.db.browse_clans(after=self.page[-1]["tag"], query=self.query)
+        if not page:
+            # Am Ende angekommen: wieder von vorne
+            page = self.db.browse_clans(query=self.query)
+        if page:
+            self.show(page)
         await self.update(interaction)
 
+    @ui.button(label="🔍 Suchen", style=discord.ButtonStyle.secondary, row=1)
+    async def search(self, interaction: discord.Interaction, button: ui.Button):
+        await interaction.response.send_modal(ClanSearchModal(self))
+
 class ClanMainView(ui.View):
     def __init__(self, db: ClanDB):
         super().__init__(timeout=None)
@@ -517,7 +1077,7 @@ class ClanMainView(ui.View):
 
     @ui.button(label="✏️ Clan erstellen", style=discord.ButtonStyle.primary, custom_id="clan:create")
     async def create(self, interaction: discord.Interaction, button: ui.Button):
-        if await self.db.get_user_clan(interaction.user.id):
+        if self.db.get_user_clan(interaction.user.id):
             return await interaction.response.send_message(
                 "❌ **Du bist bereits Mitglied eines Clans.**",
                 ephemeral=True
@@ -526,7 +1086,7 @@ class ClanMainView(ui.View):
 
     @ui.button(label="🤝 Clan beitreten", style=discord.ButtonStyle.secondary, custom_id="clan:join")
     async def join(self, interaction: discord.Interaction, button: ui.Button):
-        clans = await self.db.get_all_accepted()
+        clans = self.db.browse_clans()
 
         if not clans:
             return await interaction.response.send_message(
@@ -534,7 +1094,7 @@ class ClanMainView(ui.View):
                 ephemeral=True
             )
 
-        if await self.db.get_user_clan(interaction.user.id):
+        if self.db.get_user_clan(interaction.user.id):
             return await interaction.response.send_message(
                 "❌ **Du bist bereits Mitglied eines Clans.**",
                 ephemeral=True
@@ -549,23 +1109,24 @@ class ClanMainView(ui.View):
 
     @ui.button(label="🚪 Clan verlassen", style=discord.ButtonStyle.danger, custom_id="clan:leave")
     async def leave(self, interaction: discord.Interaction, button: ui.Button):
-        clan = await self.db.get_user_clan(interaction.user.id)
-        if not clan:
+        clan_tag = self.db.get_user_clan(interaction.user.id)
+        if not clan_tag:
             return await interaction.response.send_message(
                 "ℹ️ **Du bist aktuell in keinem Clan.**",
                 ephemeral=True
             )
 
-        if await self.db.is_owner(interaction.user.id):
+        if self.db.is_owner(interaction.user.id):
             return await interaction.response.send_message(
                 "👑 **Clan-Owner können den Clan nicht verlassen.**\nBitte wende dich an den Support.",
                 ephemeral=True
             )
 
-        data = await self.db.get_clan(clan_tag=clan["tag"])
-        role = interaction.guild.get_role(data["member_role_id"])
-        await interaction.user.remove_roles(role)
-        await self.db.remove_member(clan["tag"], interaction.user.id)
+        data = self.db.directory.get(clan_tag) or await self.db.get_clan(clan_tag=clan_tag)
+        role = interaction.guild.get_role(data["member_role_id"]) if data else None
+        if role:
+            await interaction.user.remove_roles(role)
+        await self.db.remove_member(clan_tag, interaction.user.id)
 
         await interaction.response.send_message(
             "✅ **Du hast den Clan erfolgreich verlassen.**",
@@ -598,9 +1159,289 @@ class ClanCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = ClanDB()
+        self.request_queue = RateLimitedQueue()
+        # Das Verzeichnis wird in cog_load geladen; der erste Durchlauf der Schleife kann dann entfallen
+        self._directory_preloaded = False
 
     async def cog_load(self):
+        try:
+            await self.db.ensure_indexes()
+        except Exception:
+            # Ohne eindeutige Indizes wären doppelte Clan-Tags und Beitrittsanfragen möglich
+            self.db.client.close()
+            raise
+        try:
+            await self.db.load_membership_index()
+        except Exception as e:
+            # Ohne Index würden Mitgliedschaftsprüfungen immer "kein Clan" liefern (doppelte Clans möglich)
+            print(f"❌ Fehler beim Laden des Clan-Mitgliederindex: {e}")
+            self.db.client.close()
+            raise
+        try:
+            removed = await self.db.delete_unsent_join_requests()
+            if removed:
+                print(f"🧹 {removed} Beitrittsanfragen ohne Nachricht entfernt.")
+            join_requests = await self.db.get_join_requests()
+        except Exception as e:
+            # Ohne die Anfragen hätten alle offenen Beitrittsanfragen keine funktionierenden Buttons
+            print(f"❌ Fehler beim Laden der Beitrittsanfragen: {e}")
+            self.db.client.close()
+            raise
+        try:
+            await self.db.load_stats(join_requests)
+        except Exception as e:
+            # Leere Zähler würden beim nächsten flush_stats die gespeicherten Statistiken überschreiben
+            print(f"❌ Fehler beim Laden der Clan-Statistiken: {e}")
+            self.db.client.close()
+            raise
         self.bot.add_view(ClanMainView(self.db))
+        self.bot.add_view(ClanApprovalView(self.db))
+        for request in join_requests:
+            if request.get("message_id"):
+                self.bot.add_view(JoinRequestView(self.db, request["tag"], request["user_id"]), message_id=request["message_id"])
+        # Vor dem Start laden, damit Beitritts-Browser und on_ready (Sprach-Sessions) nicht mit leerem Verzeichnis arbeiten
+        try:
+            await self.db.refresh_directory()
+            self._directory_preloaded = True
+        except Exception as e:
+            print(f"❌ Fehler beim Laden des Clan-Verzeichnisses: {e}")
+        self.refresh_directory.start()
+        self.flush_stats.start()
+        self.reconcile_job.start()
+
+    async def cog_unload(self):
+        self.refresh_directory.cancel()
+        self.flush_stats.cancel()
+        self.reconcile_job.cancel()
+        self.request_queue.stop()
+        try:
+            await self.db.flush_stats()
+        except Exception as e:
+            print(f"❌ Fehler beim Speichern der Clan-Statistiken: {e}")
+
+    @tasks.loop(seconds=DIRECTORY_TTL)
+    async def refresh_directory(self):
+        if self._directory_preloaded:
+            self._directory_preloaded = False
+            return
+        try:
+            await self.db.refresh_directory()
+        except Exception as e:
+            print(f"❌ Fehler beim Laden des Clan-Verzeichnisses: {e}")
+
+    @tasks.loop(seconds=STATS_FLUSH_INTERVAL)
+    async def flush_stats(self):
+        try:
+            await self.db.flush_stats()
+        except Exception as e:
+            print(f"❌ Fehler beim Speichern der Clan-Statistiken: {e}")
+
+    async def reconcile(self, guild: discord.Guild, repair: bool):
+        """Gleicht MongoDB mit Rollen und Kanälen des Servers ab und behebt auf Wunsch die Abweichungen."""
+        clans, member_tags, created_resources = await self.db.get_reconcile_state()
+        drift = find_drift(guild, clans, member_tags, created_resources, CLAN_CHANNEL_CATEGORY_ID, busy_tags=_clans_in_provisioning)
+        if not repair:
+            return drift, 0
+        if drift.stale_resource_ids:
+            try:
+                await self.db.forget_resources(drift.stale_resource_ids)
+            except Exception as e:
+                print(f"❌ Fehler beim Bereinigen der Clan-Ressourcen: {e}")
+        if not drift:
+            return drift, 0
+
+        futures = [
+            self.request_queue.submit("role_delete", lambda role=role: role.delete(reason="Clan-Abgleich"))
+            for role in drift.orphan_roles
+        ] + [
+            self.request_queue.submit("channel_delete", lambda channel=channel: channel.delete(reason="Clan-Abgleich"))
+            for channel in drift.orphan_channels
+        ]
+
+        failed = 0
+        if drift.orphan_member_tags:
+            try:
+                await self.db.delete_orphan_documents(drift.orphan_member_tags)
+            except Exception as e:
+                print(f"❌ Fehler beim Entfernen verwaister Clan-Dokumente: {e}")
+                failed += 1
+
+        # Fehlende Rollen/Kanäle akzeptierter Clans werden von der (fortsetzbaren) Erstellung nachgezogen
+        for tag in drift.broken_clans:
+            if tag in _clans_in_provisioning:
+                continue
+            _clans_in_provisioning.add(tag)
+            try:
+                clan = await self.db.get_clan(clan_tag=tag)
+                if clan:
+                    await provision_clan(self.db, guild, clan)
+            except Exception as e:
+                print(f"❌ Fehler beim Wiederherstellen von Clan {tag}: {e}")
+                failed += 1
+            finally:
+                _clans_in_provisioning.discard(tag)
+
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(result, Exception) and not isinstance(result, discord.NotFound):
+                print(f"❌ Fehler beim Clan-Abgleich: {result}")
+                failed += 1
+        return drift, failed
+
+    @tasks.loop(seconds=RECONCILE_INTERVAL)
+    async def reconcile_job(self):
+        # Nur melden; gelöscht oder neu erstellt wird ausschließlich über /clan-reconcile reparieren:True
+        for guild in self.bot.guilds:
+            if guild.get_channel(CLAN_CHANNEL_CATEGORY_ID) is None:
+                continue
+            try:
+                drift, _ = await self.reconcile(guild, repair=False)
+            except Exception as e:
+                print(f"❌ Fehler beim Clan-Abgleich: {e}")
+                continue
+            for line in drift.summary_lines():
+                print(f"🔧 Clan-Abgleich: {line}")
+
+    @reconcile_job.before_loop
+    async def before_reconcile_job(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="clan-reconcile", description="ADMIN: Gleicht Clans mit Rollen und Kanälen ab und behebt Abweichungen.")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(reparieren="Abweichungen direkt beheben (sonst nur anzeigen).")
+    async def clan_reconcile(self, interaction: discord.Interaction, reparieren: bool = False):
+        await interaction.response.defer(ephemeral=True)
+        drift, failed = await self.reconcile(interaction.guild, repair=reparieren)
+
+        if not drift:
+            return await interaction.followup.send("✅ **Keine Abweichungen gefunden.**", ephemeral=True)
+
+        embed = discord.Embed(
+            title="🔧 Clan-Abgleich",
+            description="\n\n".join(drift.summary_lines())[:4096],
+            color=discord.Color.orange() if not reparieren else discord.Color.green()
+        )
+        if reparieren:
+            footer = f"Repariert · {failed} Fehler" if failed else "Alle Abweichungen behoben"
+            if drift.unverified_roles or drift.unverified_channels:
+                footer += " · Nicht vom Bot erstellte Einträge bitte manuell prüfen"
+            embed.set_footer(text=footer)
+        else:
+            embed.set_footer(text="Nur Anzeige · mit reparieren:True beheben")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        occupancy = []
+        for channel_id, tag in self.db.voice_channels.items():
+            channel = self.bot.get_channel(channel_id)
+            if channel is not None:
+                occupancy.append((channel_id, tag, sum(1 for member in channel.members if not member.bot)))
+        self.db.voice.reset(occupancy, time.time())
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+        if before.channel == after.channel or member.bot:
+            return
+        voice_channels = self.db.voice_channels
+        now = time.time()
+        if before.channel is not None:
+            tag = voice_channels.get(before.channel.id)
+            if tag is not None:
+                self.db.voice.change(before.channel.id, tag, -1, now)
+        if after.channel is not None:
+            tag = voice_channels.get(after.channel.id)
+            if tag is not None:
+                self.db.voice.change(after.channel.id, tag, 1, now)
+
+    @app_commands.command(name="clan-activity", description="Zeigt, welche Clans ihren Sprachkanal am meisten nutzen.")
+    async def clan_activity(self, interaction: discord.Interaction):
+        self.db.voice.settle_all(time.time())
+        counters = [self.db.stats.clans[tag] for tag in self.db.directory if tag in self.db.stats.clans]
+        counters = [c for c in counters if c.voice_seconds > 0]
+        counters.sort(key=lambda c: c.recent_voice(), reverse=True)
+        if not counters:
+            return await interaction.response.send_message("ℹ️ **Bisher gibt es keine Sprachaktivität in Clan-Kanälen.**", ephemeral=True)
+
+        lines = []
+        for rank, c in enumerate(counters[:LEADERBOARD_SIZE], start=1):
+            clan = self.db.directory[c.tag]
+            live = self.db.voice.sessions.get(clan.get("voice_channel_id"))
+            line = (f"**{rank}.** {clan['name']} [{c.tag}] · 🔊 {int(c.recent_voice() // 60)} Min."
+                    f" (gesamt {int(c.voice_seconds // 60)} Min.)")
+            if live:
+                line += f" · 🟢 {live[0]} im Kanal"
+            lines.append(line)
+
+        embed = discord.Embed(
+            title="🔊 Clan-Sprachaktivität",
+            description="\n".join(lines),
+            color=discord.Color.blurple()
+        )
+        embed.set_footer(text=f"Personen-Minuten in den letzten {RATE_WINDOW_DAYS} Tagen")
+        await interaction.response.send_message(embed=embed)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        roles = [member.guild.get_role(role_id) for role_id in self.db.expected_role_ids(member.id)]
+        roles = [role for role in roles if role is not None and role not in member.roles]
+        if not roles:
+            return
+        try:
+            await member.add_roles(*roles, reason="Clan-Rollen wiederhergestellt")
+        except discord.HTTPException as e:
+            print(f"❌ Fehler beim Wiederherstellen der Clan-Rollen für {member}: {e}")
+
+    @app_commands.command(name="clan-resync", description="ADMIN: Gleicht die Clan-Rollen aller Mitglieder mit den Clan-Daten ab.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def clan_resync(self, interaction: discord.Interaction):
+        changes = plan_role_sync(interaction.guild, self.db.directory, self.db.clan_members)
+        if not changes:
+            return await interaction.response.send_message("✅ **Alle Clan-Rollen sind korrekt vergeben.**", ephemeral=True)
+
+        await interaction.response.send_message(f"ℹ️ **Clan-Rollen von {len(changes)} Mitglied(ern) werden angepasst...**", ephemeral=True)
+
+        def edit(member, add, remove):
+            # Hinzufügen und Entfernen in einem einzigen Request
+            roles = [role for role in member.roles if not role.is_default() and role not in remove] + add
+            return member.edit(roles=roles, reason="Clan-Rollen abgeglichen")
+
+        futures = [
+            self.request_queue.submit("member_edit", lambda member=member, add=add, remove=remove: edit(member, add, remove))
+            for member, (add, remove) in changes.items()
+        ]
+        failed = 0
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"❌ Fehler beim Abgleichen der Clan-Rollen: {result}")
+                failed += 1
+
+        content = f"✅ **Clan-Rollen von {len(changes) - failed} Mitglied(ern) abgeglichen.**"
+        if failed:
+            content += f"\n⚠️ {failed} Mitglied(er) konnten nicht angepasst werden."
+        await interaction.edit_original_response(content=content)
+
+    @app_commands.command(name="clan-leaderboard", description="Zeigt die größten Clans und ihre Aktivität.")
+    async def clan_leaderboard(self, interaction: discord.Interaction):
+        top = self.db.stats.top(LEADERBOARD_SIZE, include=lambda tag: tag in self.db.directory)
+        if not top:
+            return await interaction.response.send_message("ℹ️ **Es gibt derzeit keine aktiven Clans.**", ephemeral=True)
+
+        lines = []
+        for rank, counters in enumerate(top, start=1):
+            clan = self.db.directory[counters.tag]
+            joins, leaves = counters.rates()
+            line = f"**{rank}.** {clan['name']} [{counters.tag}] · 👥 {counters.members} · 📈 +{joins} / -{leaves}"
+            if counters.pending:
+                line += f" · ⏳ {counters.pending}"
+            lines.append(line)
+
+        embed = discord.Embed(
+            title="🏆 Clan-Rangliste",
+            description="\n".join(lines),
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Beitritte / Austritte der letzten {RATE_WINDOW_DAYS} Tage")
+        await interaction.response.send_message(embed=embed)
 
     @commands.command(name="clan-setup")
     @commands.has_permissions(administrator=True)
@@ -3,11 +3,16 @@ import dotenv
 import discord
 from discord import app_commands
 from discord.ext import commands
+from storage import Storage
 
 class TradiaBot(commands.Bot):
     def __init__(self):
         super().__init__(command_prefix='t!', help_command=None, intents=discord.Intents.all())
+        self.storage = Storage()
 
+    async def close(self):
+        await super().close()
+        await self.storage.close()
 
     async def on_ready(self):
         print(f'Eingeloggt als {self.user.name} (ID: {self.user.id})')
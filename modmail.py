@@ -1,7 +1,12 @@
+import asyncio
 import discord
 from discord.ext import commands
-from pymongo import MongoClient
-import concurrent.futures
+import motor.motor_asyncio as motor
+from pymongo import ASCENDING, DESCENDING, IndexModel
+import tempfile
+from modmail_attachments import AttachmentRelay, file_groups
+from modmail_relay import RelayBuffer, author_runs, first_image_url, group_embeds, message_text, pack_texts
+from modmail_transcript import TranscriptBuffer, transcript_entry
 from typing import Optional
 import os
 import dotenv
@@ -14,52 +19,269 @@ CLOSED_MODMAIL_CATEGORY_ID = 1447666069736128542
 SUPPORT_GUILD_ID = 1424501227521314979
 DB_NAME = "serverdata"
 COLLECTION_NAME = "modmail"
+# Abgeschlossene und offene Fälle (für den Verlauf) und die Nachrichten aller Fälle
+CASES_COLLECTION_NAME = "modmailcases"
+TRANSCRIPT_COLLECTION_NAME = "modmailtranscripts"
+# Fälle pro Seite im Fall-Verlauf
+HISTORY_PAGE_SIZE = 5
+# Verbindungs-Pool und Timeouts des MongoDB-Clients (per .env anpassbar)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MODMAIL_MONGO_MAX_POOL_SIZE", "20"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MODMAIL_MONGO_MIN_POOL_SIZE", "2"))
+MONGO_TIMEOUT_MS = int(os.getenv("MODMAIL_MONGO_TIMEOUT_MS", "5000"))
 # -----------------------------
 
 class ModMail(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
         mongo_uri = os.getenv('MONGO_URI')
 
-        self.db_client = MongoClient(mongo_uri)
+        self.db_client = motor.AsyncIOMotorClient(
+            mongo_uri,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_TIMEOUT_MS,
+            waitQueueTimeoutMS=MONGO_TIMEOUT_MS,
+            tz_aware=True
+        )
         self.db = self.db_client[DB_NAME]
         self.collection = self.db[COLLECTION_NAME]
-
-        self.bot.loop.create_task(self._create_index())
-
-    def _sync_create_index(self):
+        self.cases = self.db[CASES_COLLECTION_NAME]
+        self.transcripts = self.db[TRANSCRIPT_COLLECTION_NAME]
+        self.transcript = TranscriptBuffer(self.transcripts)
+        # Offene Fälle in beide Richtungen: User-ID -> Kanal-ID und Kanal-ID -> User-ID
+        self.case_posts = {}
+        self.case_users = {}
+        # Bündelt kurz aufeinanderfolgende Nachrichten pro Fall und Richtung
+        self.relay = RelayBuffer(self._deliver_relay)
+        self.attachments = AttachmentRelay()
+
+    async def cog_load(self):
         try:
-            self.collection.create_index("user_id", unique=True)
+            await self.collection.create_index("user_id", unique=True)
+            await self.cases.create_indexes([
+                IndexModel([("post_id", ASCENDING)], unique=True, name="post_id_unique"),
+                IndexModel([("user_id", ASCENDING), ("opened_at", DESCENDING)], name="user_opened"),
+            ])
+            await self.transcripts.create_indexes([
+                IndexModel([("case_id", ASCENDING), ("created_at", ASCENDING)], name="case_created"),
+                IndexModel([("message_id", ASCENDING)], unique=True, name="message_id_unique"),
+            ])
             print("MongoDB Index für ModMail erstellt/bestätigt.")
         except Exception as e:
             print(f"Fehler beim Erstellen des MongoDB Index: {e}")
+        try:
+            await self.load_cases()
+        except Exception as e:
+            # Ohne Index gäbe es für jeden User "keinen offenen Fall" (doppelte Kanäle, verlorene Nachrichten)
+            print(f"Fehler beim Laden der offenen Modmail-Fälle: {e}")
+            self.db_client.close()
+            raise
+        self.transcript.start()
+
+    async def load_cases(self):
+        case_posts = {}
+        async for case in self.collection.find({"type": "modmail"}, {"_id": 0, "user_id": 1, "post_id": 1}):
+            case_posts[case["user_id"]] = case["post_id"]
+        self.case_posts = case_posts
+        self.case_users = {post_id: user_id for user_id, post_id in case_posts.items()}
+        print(f"✅ {len(case_posts)} offene Modmail-Fälle geladen.")
+
+    async def cog_unload(self):
+        await self.relay.drain()
+        try:
+            await self.transcript.stop()
+        except Exception as e:
+            print(f"❌ Fehler beim Speichern der Modmail-Transkripte: {e}")
+        await self.attachments.close()
+        self.db_client.close()
+
+    @staticmethod
+    def build_relay_embeds(messages, title, color, author_name, footer=None, image_url=None):
+        """Ein oder mehrere Embeds pro Autor-Abschnitt, jeweils innerhalb der Discord-Limits."""
+        embeds = []
+        for run in author_runs(messages):
+            author = run[0].author
+            for chunk in pack_texts(message_text(message) for message in run):
+                embed = discord.Embed(title=title(author), description=chunk, color=color)
+                embed.set_author(name=author_name(author), icon_url=author.display_avatar.url)
+                if footer:
+                    embed.set_footer(text=footer)
+                embeds.append(embed)
+        if image_url and embeds:
+            embeds[-1].set_image(url=image_url)
+        return embeds
+
+    async def _deliver_relay(self, key, messages):
+        direction, user_id = key
+        if direction == "user":
+            await self._relay_to_staff(user_id, messages)
+        else:
+            await self._relay_to_user(user_id, messages)
 
-    async def _create_index(self):
-        await self.bot.loop.run_in_executor(self._executor, self._sync_create_index)
+    async def _relay_to_staff(self, user_id: int, messages):
+        post_channel = self.bot.get_channel(self.case_posts.get(user_id))
+        if post_channel is None:
+            # Fall wurde zwischenzeitlich geschlossen
+            return
+
+        # Anhänge als Dateien übernehmen, da die CDN-Links aus DMs ablaufen
+        attachments = [att for message in messages for att in message.attachments]
+        files, skipped, spools = await self.attachments.fetch(attachments, user_id, post_channel.guild.filesize_limit)
+        try:
+            embeds = self.build_relay_embeds(
+                messages,
+                title=lambda author: f"Neue Nachricht von {author.display_name}",
+                color=discord.Color.blue(),
+                author_name=lambda author: f"User ID: {author.id}",
+                image_url=first_image_url(skipped)
+            )
+            for group in group_embeds(embeds):
+                await post_channel.send(embeds=group)
+            for group in file_groups(files):
+                await post_channel.send(files=group)
+        finally:
+            self.attachments.close_spools(spools)
+
+        await messages[-1].add_reaction("✅")
+
+    async def _relay_to_user(self, user_id: int, messages):
+        channel = messages[-1].channel
+        user_to_send = self.bot.get_user(user_id)
+        if user_to_send is None:
+            await channel.send("⚠️ Konnte den User nicht finden. Der Fall kann nicht beantwortet werden.")
+            return
+
+        attachments = [att for message in messages for att in message.attachments]
+        files, skipped, spools = await self.attachments.fetch(attachments, user_id)
+        try:
+            embeds = self.build_relay_embeds(
+                messages,
+                title=lambda author: "Antwort auf deine Anfrage",
+                color=discord.Color.gold(),
+                author_name=lambda author: f"Team-Antwort von {author.display_name}",
+                footer="Sende eine Nachricht, indem du sie an mich DM'st!",
+                image_url=first_image_url(skipped)
+            )
+            for group in group_embeds(embeds):
+                await user_to_send.send(embeds=group)
+            for group in file_groups(files):
+                await user_to_send.send(files=group)
+            await messages[-1].add_reaction("✔️")
+        except discord.Forbidden:
+            await channel.send("❌ Konnte die DM nicht an den User senden (wahrscheinlich DMs deaktiviert).")
+        except Exception as e:
+            await channel.send(f"❌ Fehler beim Senden der DM: {e}")
+        finally:
+            self.attachments.close_spools(spools)
 
-    def _sync_get_modmail(self, user_id: int) -> Optional[dict]:
-        return self.collection.find_one({"user_id": user_id, "type": "modmail"})
+    def get_case_channel_id(self, user_id: int) -> Optional[int]:
+        return self.case_posts.get(user_id)
 
-    async def get_modmail(self, user_id: int) -> Optional[dict]:
-        return await self.bot.loop.run_in_executor(self._executor, self._sync_get_modmail, user_id)
+    def get_case_user_id(self, channel_id: int) -> Optional[int]:
+        return self.case_users.get(channel_id)
 
-    def _sync_create_modmail(self, user_id: int, post_id: int):
-        self.collection.insert_one({
+    async def create_modmail(self, user_id: int, post_id: int):
+        await self.collection.insert_one({
             "user_id": user_id,
             "post_id": post_id,
             "type": "modmail"
         })
+        self.case_posts[user_id] = post_id
+        self.case_users[post_id] = user_id
+        await self.cases.insert_one({
+            "user_id": user_id,
+            "post_id": post_id,
+            "opened_at": discord.utils.utcnow(),
+            "closed_at": None
+        })
 
-    async def create_modmail(self, user_id: int, post_id: int):
-        await self.bot.loop.run_in_executor(self._executor, self._sync_create_modmail, user_id, post_id)
-
-    def _sync_delete_modmail(self, user_id: int):
-        self.collection.delete_one({"user_id": user_id})
+    async def flush_case(self, user_id: int):
+        """Stellt gepufferte Nachrichten des Users und des Teams sofort zu (vor dem Schließen eines Falls)."""
+        await asyncio.gather(self.relay.flush(("user", user_id)), self.relay.flush(("staff", user_id)))
 
     async def delete_modmail(self, user_id: int):
-        await self.bot.loop.run_in_executor(self._executor, self._sync_delete_modmail, user_id)
+        await self.collection.delete_one({"user_id": user_id})
+        post_id = self.case_posts.pop(user_id, None)
+        self.attachments.forget_case(user_id)
+        if post_id is not None:
+            self.case_users.pop(post_id, None)
+            await self.cases.update_one({"post_id": post_id}, {"$set": {"closed_at": discord.utils.utcnow()}})
+
+    async def get_past_cases(self, user_id: int, before=None, exclude_post_id: int = None):
+        """Eine Seite früherer Fälle (neueste zuerst); Keyset über opened_at, gestützt auf den Index user_opened."""
+        query = {"user_id": user_id}
+        if before is not None:
+            query["opened_at"] = {"$lt": before}
+        if exclude_post_id is not None:
+            query["post_id"] = {"$ne": exclude_post_id}
+        cases = await self.cases.find(query, {"_id": 0}).sort("opened_at", DESCENDING).limit(HISTORY_PAGE_SIZE + 1).to_list(length=None)
+        return cases[:HISTORY_PAGE_SIZE], len(cases) > HISTORY_PAGE_SIZE
+
+    @staticmethod
+    def case_history_embed(user_id: int, cases, page: int) -> discord.Embed:
+        lines = []
+        for case in cases:
+            opened = discord.utils.format_dt(case["opened_at"], "d")
+            closed = discord.utils.format_dt(case["closed_at"], "d") if case.get("closed_at") else "offen"
+            lines.append(f"📁 {opened} – {closed} · Fall `{case['post_id']}`")
+        embed = discord.Embed(
+            title=f"🗂️ Frühere Modmail-Fälle von {user_id}",
+            description="\n".join(lines) or "Keine früheren Fälle.",
+            color=discord.Color.dark_grey()
+        )
+        embed.set_footer(text=f"Seite {page} · Transkript: t!transcript <Fall>")
+        return embed
+
+    async def send_case_history(self, destination, user_id: int, exclude_post_id: int = None, empty_message: str = None):
+        cases, has_more = await self.get_past_cases(user_id, exclude_post_id=exclude_post_id)
+        if not cases:
+            if empty_message:
+                await destination.send(empty_message)
+            return
+        view = CaseHistoryView(self, user_id, cases[-1]["opened_at"], exclude_post_id) if has_more else None
+        await destination.send(embed=self.case_history_embed(user_id, cases, 1), view=view)
+
+    # Verlauf früherer Fälle: im Fall-Kanal ohne Argument, sonst mit User-ID (nur Team)
+    @commands.command(name="verlauf")
+    @commands.has_permissions(manage_messages=True)
+    async def case_history(self, ctx: commands.Context, user_id: Optional[int] = None):
+        if ctx.guild is None or ctx.guild.id != SUPPORT_GUILD_ID:
+            return
+        if user_id is None:
+            user_id = self.get_case_user_id(ctx.channel.id)
+            if user_id is None:
+                await ctx.send("Bitte gib eine User-ID an oder nutze den Befehl in einem offenen Modmail-Kanal.")
+                return
+        await self.send_case_history(ctx.channel, user_id, empty_message="Für diesen User gibt es keine früheren Fälle.")
+
+    # Transkript eines Falls als Textdatei: t!transcript <Fall-ID> (nur Team)
+    @commands.command(name="transcript")
+    @commands.has_permissions(manage_messages=True)
+    async def case_transcript(self, ctx: commands.Context, case_id: Optional[int] = None):
+        if ctx.guild is None or ctx.guild.id != SUPPORT_GUILD_ID:
+            return
+        case_id = case_id or ctx.channel.id
+        # Noch gepufferte Nachrichten zuerst schreiben
+        await self.transcript.flush()
+
+        count = 0
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+b") as fh:
+            async for entry in self.transcripts.find({"case_id": case_id}, {"_id": 0}).sort("created_at", ASCENDING):
+                arrow = "➡️" if entry["direction"] == "user" else "⬅️"
+                line = f"[{entry['created_at']:%Y-%m-%d %H:%M:%S}] {arrow} {entry['author']}: {entry['content']}"
+                for att in entry.get("attachments", ()):
+                    line += f"\n    📎 {att['filename']} ({att['url']})"
+                fh.write((line + "\n").encode("utf-8"))
+                count += 1
+
+            if not count:
+                await ctx.send(f"Für den Fall `{case_id}` gibt es kein Transkript.")
+                return
+            fh.seek(0)
+            await ctx.send(f"📄 Transkript von Fall `{case_id}` ({count} Nachrichten)", file=discord.File(fh, filename=f"modmail-{case_id}.txt"))
 
     # Befehl zum Erstellen des Modmails: !m
     @commands.command(name="m")
@@ -70,7 +292,7 @@ class ModMail(commands.Cog):
 
         user_id = ctx.author.id
 
-        if await self.get_modmail(user_id):
+        if self.get_case_channel_id(user_id):
             await ctx.send("Du hast bereits einen **offenen** Modmail-Fall. Sende einfach deine Nachricht, um fortzufahren.")
             return
 
@@ -97,12 +319,25 @@ class ModMail(commands.Cog):
             await ctx.send("Konnte den Kanal auf dem Server nicht erstellen. Bitte wende dich an die Administration.")
             return
 
-        await self.create_modmail(user_id, new_channel.id)
+        try:
+            await self.create_modmail(user_id, new_channel.id)
+        except Exception as e:
+            print(f"Fehler beim Speichern des Modmail-Falls von {user_id}: {e}")
+            try:
+                await new_channel.delete(reason="Modmail-Fall konnte nicht gespeichert werden")
+            except discord.HTTPException:
+                pass
+            await ctx.send("Ein interner Fehler ist aufgetreten. Bitte versuche es später erneut oder wende dich an die Administration.")
+            return
 
         await new_channel.send(
             f"**Neuer Modmail-Fall** von {ctx.author.mention} (`{ctx.author.id}`).\n"
             f"Der Nutzer wurde benachrichtigt und kann nun per DM antworten."
         )
+        try:
+            await self.send_case_history(new_channel, user_id, exclude_post_id=new_channel.id)
+        except Exception as e:
+            print(f"Fehler beim Laden früherer Modmail-Fälle: {e}")
 
         embed = discord.Embed(
             title="✅ Modmail-Anfrage erfolgreich erstellt",
@@ -125,32 +360,22 @@ class ModMail(commands.Cog):
 
         if ctx.guild is None:
             # Fall 1: User schließt in DM
-            mail_case = await self.get_modmail(ctx.author.id)
-            if not mail_case:
+            channel_id = self.get_case_channel_id(ctx.author.id)
+            if not channel_id:
                 await ctx.send("Du hast keinen **offenen** Modmail-Fall, den ich schließen könnte.")
                 return
 
             user_id_to_delete = ctx.author.id
-            channel_id = mail_case['post_id']
             channel = self.bot.get_channel(channel_id)
             user_display_name = str(ctx.author.display_name).lower().replace(' ', '-')
 
         else:
             # Fall 2: Team schließt auf dem Server
-            channel_parts = ctx.channel.name.split('-')
-
-            try:
-                if len(channel_parts) < 3 or not ctx.channel.name.startswith("open-"):
+            user_id_to_delete = self.get_case_user_id(ctx.channel.id)
+            if user_id_to_delete is None:
+                if not ctx.channel.name.startswith("open-"):
                     await ctx.send("Dieser Kanal scheint kein offener Modmail-Kanal zu sein.")
                     return
-
-                user_id_to_delete = int(channel_parts[-1])
-            except ValueError:
-                await ctx.send("Konnte die User-ID nicht aus dem Kanalnamen extrahieren.")
-                return
-
-            mail_case = await self.get_modmail(user_id_to_delete)
-            if not mail_case:
                 await ctx.send("Dieser Modmail-Fall scheint bereits geschlossen zu sein (nicht in der DB gefunden).")
                 # Trotzdem versuchen, den Kanal umzubenennen, falls er noch offen-benannt ist
                 await ctx.channel.edit(name=f"deleted-{ctx.channel.name}")
@@ -160,7 +385,8 @@ class ModMail(commands.Cog):
             user = self.bot.get_user(user_id_to_delete)
             user_display_name = str(user.display_name).lower().replace(' ', '-') if user else "deleted-user"
 
-
+        # Noch gepufferte Nachrichten beider Richtungen zustellen, solange der Fall offen ist
+        await self.flush_case(user_id_to_delete)
         await self.delete_modmail(user_id_to_delete)
 
         # Den Kanal umbenennen und in die geschlossene Kategorie verschieben
@@ -205,17 +431,17 @@ class ModMail(commands.Cog):
         # Nur Mods/Admins sollen löschen dürfen. Hier könnten Berechtigungsprüfungen eingefügt werden.
         # Beispiel: if not ctx.author.guild_permissions.manage_channels: return
 
-        # Prüfen, ob der Kanalname das Modmail-Format (open- oder deleted-) hat, um versehentliches Löschen zu verhindern
-        if not ctx.channel.name.startswith("open-") and not ctx.channel.name.startswith("deleted-"):
+        user_id = self.get_case_user_id(ctx.channel.id)
+
+        # Prüfen, ob es ein offener Fall ist oder der Kanalname das Modmail-Format (open- oder deleted-) hat, um versehentliches Löschen zu verhindern
+        if user_id is None and not ctx.channel.name.startswith("open-") and not ctx.channel.name.startswith("deleted-"):
             await ctx.send("Dieser Kanal scheint kein Modmail-Kanal zu sein. Löschvorgang abgebrochen.")
             return
 
-        # Optional: Prüfen, ob der Fall in der DB ist, und ihn löschen, falls er noch offen ist
-        channel_parts = ctx.channel.name.split('-')
+        # Offenen Fall schließen, bevor der Kanal gelöscht wird
         try:
-            user_id = int(channel_parts[-1])
-            mail_case = await self.get_modmail(user_id)
-            if mail_case:
+            if user_id is not None:
+                await self.flush_case(user_id)
                 await self.delete_modmail(user_id)
                 user_to_notify = self.bot.get_user(user_id)
                 if user_to_notify:
@@ -244,83 +470,67 @@ class ModMail(commands.Cog):
         prefix_used = message.content.split(' ')[0]
         if prefix_used.startswith(self.bot.command_prefix):
             # Ignoriere Nachrichten, die mit !m, !c oder !del beginnen, um die Commands nicht zu triggern
-            if prefix_used in [self.bot.command_prefix + "m", self.bot.command_prefix + "c", self.bot.command_prefix + "del"]:
+            if prefix_used in [self.bot.command_prefix + name for name in ("m", "c", "del", "verlauf", "transcript")]:
                 return
 
         if message.guild is None:
             user_id = message.author.id
-            mail_case = await self.get_modmail(user_id)
+            post_id = self.get_case_channel_id(user_id)
 
-            if not mail_case:
+            if not post_id:
                 if not message.content.startswith("!"):
                     await message.channel.send("Du hast keinen **offenen** Modmail-Fall. Bitte benutze `t!m`, um eine neue Supportanfrage zu starten.")
                 return
 
-            post_channel = self.bot.get_channel(mail_case['post_id'])
+            post_channel = self.bot.get_channel(post_id)
 
             if post_channel is None:
                 await self.delete_modmail(user_id)
                 await message.channel.send("Fehler: Dein Modmail-Kanal auf dem Server wurde nicht gefunden. Dein Fall wurde geschlossen. Starte ihn neu mit `!m`.")
                 return
 
-            embed = discord.Embed(
-                title=f"Neue Nachricht von {message.author.display_name}",
-                description=message.content,
-                color=discord.Color.blue()
-            )
-            embed.set_author(name=f"User ID: {user_id}", icon_url=message.author.display_avatar.url)
-
-            if message.attachments:
-                attachments_list = "\n".join([f"[{att.filename}]({att.url})" for att in message.attachments])
-                embed.add_field(name="Anhänge", value=attachments_list, inline=False)
-                if message.attachments[0].content_type in ('image/png', 'image/jpeg', 'image/gif'):
-                    embed.set_image(url=message.attachments[0].url)
-
-            await post_channel.send(embed=embed)
-
-            await message.add_reaction("✅")
+            self.relay.add(("user", user_id), message)
+            self.transcript.append(transcript_entry(post_id, user_id, "user", message))
             return
 
         else:
             if message.guild.id != SUPPORT_GUILD_ID:
                 return
 
-            # Nur Nachrichten in offenen Kanälen weiterleiten
-            if not message.channel.name.startswith("open-"):
-                return
-
-            try:
-                user_id = int(message.channel.name.split('-')[-1])
-            except ValueError:
+            # Nur Nachrichten in Kanälen offener Fälle weiterleiten
+            user_id = self.get_case_user_id(message.channel.id)
+            if user_id is None:
                 return
 
-            mail_case = await self.get_modmail(user_id)
-            if not mail_case:
-                return
-
-            user_to_send = self.bot.get_user(user_id)
-            if user_to_send is None:
+            if self.bot.get_user(user_id) is None:
                 await message.channel.send("⚠️ Konnte den User nicht finden. Der Fall kann nicht beantwortet werden.")
                 return
 
-            embed = discord.Embed(
-                title=f"Antwort auf deine Anfrage",
-                description=message.content,
-                color=discord.Color.gold()
-            )
-            embed.set_author(
-                name=f"Team-Antwort von {message.author.display_name}",
-                icon_url=message.author.display_avatar.url
-            )
-            embed.set_footer(text="Sende eine Nachricht, indem du sie an mich DM'st!")
-
-            try:
-                await user_to_send.send(embed=embed)
-                await message.add_reaction("✔️")
-            except discord.Forbidden:
-                await message.channel.send("❌ Konnte die DM nicht an den User senden (wahrscheinlich DMs deaktiviert).")
-            except Exception as e:
-                await message.channel.send(f"❌ Fehler beim Senden der DM: {e}")
+            self.relay.add(("staff", user_id), message)
+            self.transcript.append(transcript_entry(message.channel.id, user_id, "staff", message))
+
+
+class CaseHistoryView(discord.ui.View):
+    def __init__(self, cog: ModMail, user_id: int, cursor, exclude_post_id: int = None):
+        super().__init__(timeout=600)
+        self.cog = cog
+        self.user_id = user_id
+        self.cursor = cursor
+        self.exclude_post_id = exclude_post_id
+        self.page = 1
+
+    @discord.ui.button(label="⬅️ Ältere Fälle", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: discord.Interaction, button: discord.ui.Button):
+        cases, has_more = await self.cog.get_past_cases(self.user_id, before=self.cursor, exclude_post_id=self.exclude_post_id)
+        if not cases:
+            return await interaction.response.edit_message(view=None)
+        self.page += 1
+        self.cursor = cases[-1]["opened_at"]
+        button.disabled = not has_more
+        await interaction.response.edit_message(
+            embed=self.cog.case_history_embed(self.user_id, cases, self.page),
+            view=self
+        )
 
 
 async def setup(bot):
@@ -0,0 +1,107 @@
+import asyncio
+import tempfile
+import aiohttp
+import discord
+
+# --- Konfigurationsvariablen ---
+# Gleichzeitige Downloads über alle Fälle hinweg
+ATTACHMENT_CONCURRENCY = 4
+# Größte Datei, die erneut hochgeladen wird (Upload-Limit für Bots ohne Boost)
+MAX_FILE_BYTES = 10 * 1024 * 1024
+# Höchstens so viele Bytes pro Fall (über alle Weiterleitungen); darüber bleiben Anhänge nur als Link erhalten
+MAX_CASE_BYTES = 50 * 1024 * 1024
+# Bis zu dieser Größe bleibt ein Anhang im Speicher, darüber wird er in eine temporäre Datei ausgelagert
+SPOOL_THRESHOLD = 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+FILES_PER_MESSAGE = 10
+# ------------------------------
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+class AttachmentRelay:
+    """Lädt Anhänge gestreamt herunter, damit sie als Dateien erneut hochgeladen werden können.
+
+    Jeder Anhang landet in einer SpooledTemporaryFile; große Dateien (z. B. Videos) liegen dadurch nie
+    komplett im Speicher. Der Aufrufer muss die zurückgegebenen Spool-Dateien mit `close_spools` schließen.
+    """
+
+    def __init__(self):
+        self._semaphore = asyncio.Semaphore(ATTACHMENT_CONCURRENCY)
+        self._session = None
+        # Fall -> bereits erneut hochgeladene Bytes
+        self._case_bytes = {}
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def forget_case(self, case_key):
+        """Gibt das Byte-Budget eines geschlossenen Falls frei."""
+        self._case_bytes.pop(case_key, None)
+
+    async def fetch(self, attachments, case_key, max_file_bytes: int = MAX_FILE_BYTES):
+        """Gibt (discord.File-Liste, übersprungene Anhänge, Spool-Dateien) zurück; `case_key` bestimmt das Byte-Budget."""
+        await self.start()
+        max_file_bytes = min(max_file_bytes, MAX_FILE_BYTES)
+        used = self._case_bytes.get(case_key, 0)
+
+        accepted, skipped = [], []
+        for att in attachments:
+            # Budget anhand der angegebenen Größe reservieren; beim Download wird zusätzlich mitgezählt
+            if att.size > max_file_bytes or used + att.size > MAX_CASE_BYTES:
+                skipped.append(att)
+                continue
+            used += att.size
+            accepted.append(att)
+        self._case_bytes[case_key] = used
+
+        results = await asyncio.gather(*(self._download(att, max_file_bytes) for att in accepted), return_exceptions=True)
+
+        files, spools = [], []
+        for att, result in zip(accepted, results):
+            if isinstance(result, Exception):
+                print(f"⚠️ Anhang {att.filename} konnte nicht übernommen werden: {result}")
+                skipped.append(att)
+                # Nicht übernommene Anhänge belasten das Budget nicht
+                if case_key in self._case_bytes:
+                    self._case_bytes[case_key] = max(0, self._case_bytes[case_key] - att.size)
+            else:
+                spools.append(result)
+                files.append(discord.File(result, filename=att.filename, spoiler=att.is_spoiler()))
+        return files, skipped, spools
+
+    async def _download(self, att: discord.Attachment, limit: int):
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD)
+        try:
+            async with self._semaphore:
+                async with self._session.get(att.url) as response:
+                    response.raise_for_status()
+                    size = 0
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > limit:
+                            raise AttachmentTooLarge(f"größer als {limit} Bytes")
+                        spool.write(chunk)
+            spool.seek(0)
+            return spool
+        except BaseException:
+            spool.close()
+            raise
+
+    @staticmethod
+    def close_spools(spools):
+        for spool in spools:
+            # Über die Klasse aufrufen: discord.File ersetzt close() auf der Instanz durch einen Platzhalter
+            tempfile.SpooledTemporaryFile.close(spool)
+
+
+def file_groups(files):
+    return [files[i:i + FILES_PER_MESSAGE] for i in range(0, len(files), FILES_PER_MESSAGE)]
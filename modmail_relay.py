@@ -0,0 +1,124 @@
+import asyncio
+import discord
+
+# Zeitfenster, in dem aufeinanderfolgende Nachrichten eines Falls zusammengefasst werden (Sekunden)
+COALESCE_WINDOW = 1.5
+# Discord-Limits für Embeds
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBED_TOTAL_LIMIT = 6000
+EMBEDS_PER_MESSAGE = 10
+IMAGE_CONTENT_TYPES = ('image/png', 'image/jpeg', 'image/gif')
+
+
+def message_text(message: discord.Message) -> str:
+    parts = [message.content] if message.content else []
+    if message.attachments:
+        parts.append("📎 " + ", ".join(f"[{att.filename}]({att.url})" for att in message.attachments))
+    return "\n".join(parts)
+
+
+def pack_texts(texts, limit: int = EMBED_DESCRIPTION_LIMIT):
+    """Fügt Texte zu möglichst wenigen Blöcken von höchstens `limit` Zeichen zusammen; zu lange Texte werden geteilt."""
+    chunks = []
+    current = ""
+    for text in texts:
+        for start in range(0, len(text), limit):
+            piece = text[start:start + limit]
+            if current and len(current) + 1 + len(piece) > limit:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def author_runs(messages):
+    """Teilt die Nachrichten in Abschnitte aufeinanderfolgender Nachrichten desselben Autors."""
+    runs = []
+    for message in messages:
+        if runs and runs[-1][0].author.id == message.author.id:
+            runs[-1].append(message)
+        else:
+            runs.append([message])
+    return runs
+
+
+def first_image_url(attachments):
+    for att in attachments:
+        if att.content_type in IMAGE_CONTENT_TYPES:
+            return att.url
+    return None
+
+
+def group_embeds(embeds):
+    """Verteilt Embeds auf Nachrichten (max. 10 Embeds und 6000 Zeichen pro Nachricht)."""
+    groups = []
+    current, size = [], 0
+    for embed in embeds:
+        if current and (len(current) >= EMBEDS_PER_MESSAGE or size + len(embed) > EMBED_TOTAL_LIMIT):
+            groups.append(current)
+            current, size = [], 0
+        current.append(embed)
+        size += len(embed)
+    if current:
+        groups.append(current)
+    return groups
+
+
+class RelayBuffer:
+    """Sammelt Nachrichten pro Fall und Richtung und leitet sie nach COALESCE_WINDOW gebündelt weiter.
+
+    Pro Schlüssel läuft höchstens ein Task, dadurch bleibt die Reihenfolge erhalten: Nachrichten, die
+    während des Sendens eintreffen, werden im nächsten Durchlauf desselben Tasks zugestellt.
+    """
+
+    def __init__(self, deliver, window: float = COALESCE_WINDOW):
+        self._deliver = deliver
+        self.window = window
+        self._pending = {}
+        self._tasks = {}
+        # Pro Schlüssel: wird gesetzt, damit der Task sofort zustellt statt das Zeitfenster abzuwarten
+        self._flush_now = {}
+
+    def add(self, key, message: discord.Message):
+        self._pending.setdefault(key, []).append(message)
+        if key not in self._tasks:
+            self._flush_now[key] = asyncio.Event()
+            self._tasks[key] = asyncio.create_task(self._run(key, self._flush_now[key]))
+
+    async def _run(self, key, flush_now: asyncio.Event):
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(flush_now.wait(), timeout=self.window)
+                except asyncio.TimeoutError:
+                    pass
+                messages = self._pending.pop(key, None)
+                if not messages:
+                    break
+                await self._send(key, messages)
+        finally:
+            self._tasks.pop(key, None)
+            self._flush_now.pop(key, None)
+
+    async def _send(self, key, messages):
+        try:
+            await self._deliver(key, messages)
+        except Exception as e:
+            print(f"❌ Fehler beim Weiterleiten von Modmail-Nachrichten ({key}): {e}")
+
+    async def flush(self, key):
+        """Stellt die gepufferten Nachrichten eines Schlüssels sofort zu (z. B. bevor ein Fall geschlossen wird)."""
+        task = self._tasks.get(key)
+        if task is None:
+            return
+        self._flush_now[key].set()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def drain(self):
+        """Stellt alle gepufferten Nachrichten sofort zu (z. B. beim Entladen des Cogs)."""
+        for flush_now in self._flush_now.values():
+            flush_now.set()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
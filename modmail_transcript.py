@@ -0,0 +1,89 @@
+import asyncio
+import discord
+from pymongo.errors import BulkWriteError
+
+# Puffer wird geschrieben, sobald so viele Nachrichten anstehen ...
+TRANSCRIPT_FLUSH_SIZE = 50
+# ... spätestens aber nach so vielen Sekunden
+TRANSCRIPT_FLUSH_INTERVAL = 5
+# Obergrenze, falls MongoDB länger nicht erreichbar ist (älteste Einträge werden verworfen)
+TRANSCRIPT_MAX_BUFFERED = 5000
+
+
+def transcript_entry(case_id: int, user_id: int, direction: str, message: discord.Message) -> dict:
+    return {
+        "case_id": case_id,
+        "user_id": user_id,
+        "direction": direction,
+        "message_id": message.id,
+        "author_id": message.author.id,
+        "author": str(message.author),
+        "content": message.content,
+        "attachments": [
+            {"filename": att.filename, "url": att.url, "size": att.size} for att in message.attachments
+        ],
+        "created_at": message.created_at,
+    }
+
+
+class TranscriptBuffer:
+    """Write-behind-Puffer für Modmail-Transkripte: sammelt Einträge und schreibt sie per insert_many."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._buffer = []
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def append(self, entry: dict):
+        self._buffer.append(entry)
+        if len(self._buffer) >= TRANSCRIPT_FLUSH_SIZE:
+            self._full.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Beendet den Hintergrund-Task und schreibt alles Gepufferte."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=TRANSCRIPT_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Fehler beim Speichern der Modmail-Transkripte: {e}")
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            entries, self._buffer = self._buffer, []
+            try:
+                await self.collection.insert_many(entries, ordered=False)
+            except BulkWriteError as e:
+                # Bereits gespeicherte Nachrichten (doppelte message_id) zählen als erledigt
+                failed = [entries[error["index"]] for error in e.details.get("writeErrors", ()) if error.get("code") != 11000]
+                self._requeue(failed)
+                if failed:
+                    raise
+            except BaseException:
+                self._requeue(entries)
+                raise
+
+    def _requeue(self, entries):
+        # Beim nächsten Durchlauf erneut versuchen, ohne unbegrenzt zu wachsen
+        self._buffer = (entries + self._buffer)[-TRANSCRIPT_MAX_BUFFERED:]
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+# Clientseitige Drosselung (Requests pro Sekunde, Burst) für Routen ohne eigene Angabe
+DEFAULT_ROUTE_LIMIT = (1.0, 5)
+# Eigene, geschätzte Drosselung pro Auftragsart. Das sind nicht Discords echte Buckets pro Route;
+# die meldet erst die API, und auf 429 wartet discord.py selbst und wiederholt den Request
+ROUTE_LIMITS = {
+    "channel_delete": (1.0, 5),
+    "role_delete": (1.0, 5),
+    "role_edit": (2.0, 10),
+    "message_edit": (1.0, 5),
+    "member_edit": (1.0, 10),
+}
+
+
+class TokenBucket:
+    """Klassischer Token-Bucket: `rate` Tokens pro Sekunde, höchstens `capacity` auf Vorrat."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    async def acquire(self):
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_after())
+
+
+class RateLimitedQueue:
+    """Hintergrund-Warteschlange für Discord-Requests mit einem Token-Bucket pro Route.
+
+    Aufträge werden als (Route, Coroutine-Factory) eingereicht. Die Buckets verteilen die Requests nur
+    gleichmäßiger, damit discord.py seltener in ein Rate-Limit läuft; 429-Antworten behandelt discord.py selbst.
+    """
+
+    def __init__(self, workers: int = 2):
+        self._queue = asyncio.Queue()
+        self._buckets = {}
+        self._workers = workers
+        self._tasks = []
+
+    def _bucket(self, route: str) -> TokenBucket:
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            rate, burst = ROUTE_LIMITS.get(route, DEFAULT_ROUTE_LIMIT)
+            bucket = self._buckets[route] = TokenBucket(rate, burst)
+        return bucket
+
+    def start(self):
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self._workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def submit(self, route: str, factory) -> asyncio.Future:
+        """Reiht einen Request ein; das Future liefert das Ergebnis bzw. die Exception."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((route, factory, future))
+        return future
+
+    async def _worker(self):
+        while True:
+            route, factory, future = await self._queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                result = await self._run(route, factory)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, route: str, factory):
+        await self._bucket(route).acquire()
+        return await factory()
+
+    async def join(self):
+        await self._queue.join()
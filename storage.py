@@ -0,0 +1,133 @@
+import asyncio
+import aiosqlite
+
+# Wie lange Schreibzugriffe gesammelt werden, bevor gemeinsam committet wird (Sekunden)
+GROUP_COMMIT_DELAY = 0.02
+# Anzahl der vorbereiteten Statements, die sqlite pro Verbindung im Cache hält
+STATEMENT_CACHE_SIZE = 256
+
+
+class Database:
+    """Eine dauerhaft offene SQLite-Verbindung mit WAL-Modus und Group-Commit."""
+
+    def __init__(self, path: str, commit_delay: float = GROUP_COMMIT_DELAY):
+        self.path = path
+        self.commit_delay = commit_delay
+        self.conn = None
+        self._open_lock = asyncio.Lock()
+        self._pending = []
+        self._commit_task = None
+
+    async def open(self):
+        async with self._open_lock:
+            if self.conn is not None:
+                return self.conn
+
+            conn = await aiosqlite.connect(self.path, cached_statements=STATEMENT_CACHE_SIZE)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute("PRAGMA foreign_keys=ON")
+            self.conn = conn
+            return conn
+
+    async def _connection(self):
+        if self.conn is None:
+            await self.open()
+        return self.conn
+
+    async def fetchone(self, sql: str, params=()):
+        conn = await self._connection()
+        async with conn.execute(sql, params) as cursor:
+            return await cursor.fetchone()
+
+    async def fetchall(self, sql: str, params=()):
+        conn = await self._connection()
+        async with conn.execute(sql, params) as cursor:
+            return await cursor.fetchall()
+
+    async def execute(self, sql: str, params=()):
+        """Führt einen Schreibzugriff aus und wartet, bis er im nächsten Group-Commit gelandet ist."""
+        conn = await self._connection()
+        await conn.execute(sql, params)
+        await self._wait_for_commit()
+
+    async def executemany(self, sql: str, seq_of_params):
+        conn = await self._connection()
+        await conn.executemany(sql, seq_of_params)
+        await self._wait_for_commit()
+
+    async def executescript(self, script: str):
+        conn = await self._connection()
+        await conn.executescript(script)
+        await conn.commit()
+
+    async def add_missing_columns(self, table: str, columns: dict):
+        """Einfache Schema-Migration: legt fehlende Spalten (Name -> SQL-Typ) per ALTER TABLE an."""
+        rows = await self.fetchall(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in rows}
+        added = []
+        for name, column_type in columns.items():
+            if name not in existing:
+                await self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+                added.append(name)
+        if added:
+            await self.conn.commit()
+            print(f"✅ Tabelle '{table}' migriert, neue Spalten: {', '.join(added)}")
+        return added
+
+    async def _wait_for_commit(self):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        if self._commit_task is None or self._commit_task.done():
+            self._commit_task = asyncio.create_task(self._group_commit())
+        await future
+
+    async def _group_commit(self):
+        await asyncio.sleep(self.commit_delay)
+        waiters, self._pending = self._pending, []
+        try:
+            await self.conn.commit()
+        except Exception as e:
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future in waiters:
+                if not future.done():
+                    future.set_result(None)
+        finally:
+            # Falls während des Commits neue Schreibzugriffe kamen, gleich den nächsten Commit planen
+            if self._pending and self.conn is not None:
+                self._commit_task = asyncio.create_task(self._group_commit())
+
+    async def close(self):
+        if self.conn is None:
+            return
+        # Auch Folge-Commits abwarten, die ein laufender Commit noch geplant hat
+        while self._commit_task is not None and not self._commit_task.done():
+            await asyncio.gather(self._commit_task, return_exceptions=True)
+        await self.conn.commit()
+        await self.conn.close()
+        self.conn = None
+
+
+class Storage:
+    """Gehört dem Bot und hält für jede SQLite-Datei genau eine offene Verbindung."""
+
+    def __init__(self):
+        self._databases = {}
+
+    def database(self, path: str) -> Database:
+        db = self._databases.get(path)
+        if db is None:
+            db = Database(path)
+            self._databases[path] = db
+        return db
+
+    async def close(self):
+        for db in self._databases.values():
+            try:
+                await db.close()
+            except Exception as e:
+                print(f"❌ Fehler beim Schließen der Datenbank '{db.path}': {e}")
+        self._databases.clear()
@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+import aiohttp
+import discord
+
+# --- Konfigurationsvariablen ---
+ARCHIVE_DIR = 'ticket_archives'
+# Nachrichten pro Seite beim Lesen des Verlaufs (Discord liefert max. 100 pro Request)
+HISTORY_PAGE_SIZE = 100
+# Gleichzeitige Anhang-Downloads
+ATTACHMENT_CONCURRENCY = 4
+# Maximal gleichzeitig offene Download-Tasks, damit der Speicher auch bei riesigen Tickets begrenzt bleibt
+MAX_PENDING_DOWNLOADS = 32
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# ------------------------------
+
+
+def _safe_filename(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]', '_', name)[:100] or 'datei'
+
+
+def serialize_message(message: discord.Message, attachment_paths) -> dict:
+    return {
+        "id": message.id,
+        "created_at": message.created_at.isoformat(),
+        "edited_at": message.edited_at.isoformat() if message.edited_at else None,
+        "author_id": message.author.id,
+        "author": str(message.author),
+        "bot": message.author.bot,
+        "content": message.content,
+        "embeds": [embed.to_dict() for embed in message.embeds],
+        "attachments": [
+            {"filename": att.filename, "url": att.url, "size": att.size, "path": path}
+            for att, path in zip(message.attachments, attachment_paths)
+        ],
+    }
+
+
+async def iter_history_pages(channel: discord.abc.Messageable, page_size: int = HISTORY_PAGE_SIZE):
+    """Liefert den Kanalverlauf seitenweise (älteste zuerst), ohne ihn komplett zu laden."""
+    page = []
+    async for message in channel.history(limit=None, oldest_first=True):
+        page.append(message)
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+class TicketArchiver:
+    """Schreibt den Verlauf eines Ticket-Kanals als gzip-JSONL auf die Platte, inkl. Anhängen."""
+
+    def __init__(self, base_dir: str = ARCHIVE_DIR):
+        self.base_dir = base_dir
+        self._semaphore = asyncio.Semaphore(ATTACHMENT_CONCURRENCY)
+
+    async def archive(self, channel: discord.TextChannel) -> str:
+        target_dir = os.path.join(self.base_dir, str(channel.id))
+        attachment_dir = os.path.join(target_dir, 'attachments')
+        await asyncio.to_thread(os.makedirs, attachment_dir, exist_ok=True)
+
+        transcript_path = os.path.join(target_dir, 'transcript.jsonl.gz')
+        pending = set()
+        errors = []
+        message_count = 0
+
+        fh = await asyncio.to_thread(gzip.open, transcript_path, 'wt', encoding='utf-8')
+        try:
+            async with aiohttp.ClientSession() as session:
+                async for page in iter_history_pages(channel):
+                    lines = []
+                    for message in page:
+                        paths = []
+                        for index, att in enumerate(message.attachments):
+                            path = os.path.join(attachment_dir, f"{message.id}_{index}_{_safe_filename(att.filename)}")
+                            paths.append(os.path.relpath(path, target_dir))
+
+                            # Nie mehr als MAX_PENDING_DOWNLOADS Tasks gleichzeitig im Speicher halten
+                            if len(pending) >= MAX_PENDING_DOWNLOADS:
+                                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                                self._collect_errors(done, errors)
+                            pending.add(asyncio.create_task(self._download(session, att.url, path)))
+
+                        lines.append(json.dumps(serialize_message(message, paths), ensure_ascii=False))
+
+                    message_count += len(page)
+                    await asyncio.to_thread(fh.write, "\n".join(lines) + "\n")
+
+                if pending:
+                    done, pending = await asyncio.wait(pending)
+                    self._collect_errors(done, errors)
+        finally:
+            # Bei einem Abbruch dürfen keine Downloads mehr in das Archiv schreiben
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            await asyncio.to_thread(fh.close)
+
+        print(f"[Archiv] Ticket {channel.id}: {message_count} Nachrichten archiviert, {len(errors)} Anhänge fehlgeschlagen.")
+        return target_dir
+
+    async def _download(self, session: aiohttp.ClientSession, url: str, path: str):
+        async with self._semaphore:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                out = await asyncio.to_thread(open, path, 'wb')
+                try:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        await asyncio.to_thread(out.write, chunk)
+                except BaseException:
+                    # Keine halb geschriebenen Dateien im Archiv zurücklassen
+                    await asyncio.to_thread(out.close)
+                    await asyncio.to_thread(os.remove, path)
+                    raise
+                await asyncio.to_thread(out.close)
+
+    @staticmethod
+    def _collect_errors(done, errors):
+        for task in done:
+            if task.exception() is not None:
+                errors.append(task.exception())
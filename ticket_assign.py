@@ -0,0 +1,64 @@
+import heapq
+
+
+class StaffLoadBalancer:
+    """Zählt geclaimte Tickets pro Teammitglied und liefert das am wenigsten ausgelastete in O(log n).
+
+    Der Heap enthält (Last, Teammitglied)-Paare. Bei jeder Laständerung wird ein neues Paar eingefügt;
+    veraltete Paare werden beim Auslesen übersprungen und der Heap gelegentlich neu aufgebaut.
+    """
+
+    def __init__(self):
+        self.loads = {}
+        self.staff = set()
+        self._heap = []
+
+    def _push(self, staff_id: int):
+        heapq.heappush(self._heap, (self.loads.get(staff_id, 0), staff_id))
+        if len(self._heap) > 4 * len(self.staff) + 64:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(self.loads.get(staff_id, 0), staff_id) for staff_id in self.staff]
+        heapq.heapify(self._heap)
+
+    def set_staff(self, staff_ids):
+        self.staff = set(staff_ids)
+        self._rebuild()
+
+    def add_staff(self, staff_id: int):
+        if staff_id not in self.staff:
+            self.staff.add(staff_id)
+            self._push(staff_id)
+
+    def remove_staff(self, staff_id: int):
+        # Der Heap-Eintrag wird beim Auslesen verworfen
+        self.staff.discard(staff_id)
+
+    def change(self, staff_id: int, delta: int):
+        load = self.loads.get(staff_id, 0) + delta
+        if load > 0:
+            self.loads[staff_id] = load
+        else:
+            self.loads.pop(staff_id, None)
+        if staff_id in self.staff:
+            self._push(staff_id)
+
+    def pick(self, is_eligible):
+        """Gibt das am wenigsten ausgelastete Teammitglied zurück, für das is_eligible(staff_id) wahr ist."""
+        skipped = []
+        chosen = None
+        try:
+            while self._heap:
+                load, staff_id = self._heap[0]
+                if staff_id not in self.staff or self.loads.get(staff_id, 0) != load:
+                    heapq.heappop(self._heap)
+                    continue
+                if is_eligible(staff_id):
+                    chosen = staff_id
+                    break
+                skipped.append(heapq.heappop(self._heap))
+        finally:
+            for entry in skipped:
+                heapq.heappush(self._heap, entry)
+        return chosen
@@ -0,0 +1,75 @@
+import asyncio
+import heapq
+import time
+
+
+class DeadlineScheduler:
+    """Ein einziger Min-Heap für alle Ablaufzeiten statt eines schlafenden Tasks pro Ticket.
+
+    Wird eine Deadline nur nach hinten verschoben (der Normalfall bei jeder neuen Nachricht), bleibt
+    der alte Heap-Eintrag liegen und wird beim Erreichen einfach neu eingeplant. So hat jedes Ticket
+    höchstens ein bis zwei Einträge im Heap, egal wie viele Nachrichten geschrieben werden.
+    """
+
+    def __init__(self, callback):
+        self._callback = callback
+        self._heap = []
+        self._deadlines = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, key, deadline: float):
+        previous = self._deadlines.get(key)
+        self._deadlines[key] = deadline
+        if previous is None or deadline < previous:
+            heapq.heappush(self._heap, (deadline, key))
+            if self._heap[0][1] == key:
+                self._wakeup.set()
+
+    def cancel(self, key):
+        # Der Heap-Eintrag wird beim Erreichen verworfen
+        self._deadlines.pop(key, None)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            deadline, key = self._heap[0]
+            delay = deadline - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            current = self._deadlines.get(key)
+            if current is None or current < deadline:
+                # Abgebrochen oder durch einen früheren Eintrag ersetzt
+                continue
+            if current > deadline:
+                # Deadline wurde zwischenzeitlich verlängert
+                heapq.heappush(self._heap, (current, key))
+                continue
+
+            del self._deadlines[key]
+            try:
+                await self._callback(key)
+            except Exception as e:
+                print(f"❌ Fehler beim Ausführen der Deadline für {key}: {e}")
@@ -0,0 +1,104 @@
+import math
+
+# Relative Breite der Histogramm-Buckets (10 % -> Perzentile sind auf ca. 10 % genau)
+BUCKET_GROWTH = 1.1
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds}s"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes}m"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h"
+
+
+class DurationHistogram:
+    """Log-skaliertes Histogramm: konstanter Speicher, Einfügen/Entfernen in O(1)."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+
+    @staticmethod
+    def _bucket(seconds: float) -> int:
+        if seconds < 1:
+            return 0
+        return int(math.log(seconds) / _LOG_GROWTH) + 1
+
+    def add(self, seconds: float, weight: int = 1):
+        bucket = self._bucket(seconds)
+        value = self.buckets.get(bucket, 0) + weight
+        if value:
+            self.buckets[bucket] = value
+        else:
+            self.buckets.pop(bucket, None)
+        self.count += weight
+
+    def percentile(self, q: float):
+        if self.count <= 0:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # Geometrische Mitte des Buckets [g^(b-1), g^b)
+                return BUCKET_GROWTH ** (bucket - 0.5) if bucket else 0.5
+        return None
+
+
+class TicketStats:
+    """Inkrementell gepflegte Kennzahlen: Zeit bis Claim und bis Schließen, je Ticket-Typ und Teammitglied."""
+
+    PERCENTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self):
+        self.claim_by_type = {}
+        self.claim_by_staff = {}
+        self.close_by_type = {}
+        self.close_by_staff = {}
+
+    def clear(self):
+        for table in (self.claim_by_type, self.claim_by_staff, self.close_by_type, self.close_by_staff):
+            table.clear()
+
+    @staticmethod
+    def _add(table, key, seconds, weight):
+        if key is None:
+            return
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = DurationHistogram()
+        histogram.add(seconds, weight)
+        if histogram.count <= 0:
+            del table[key]
+
+    def record(self, ticket, weight: int = 1):
+        """Fügt die Messwerte eines Tickets hinzu (weight=1) oder nimmt sie wieder heraus (weight=-1)."""
+        created_at = ticket.get('created_at')
+        if created_at is None:
+            return
+        ticket_type = ticket.get('ticket_type') or 'unbekannt'
+
+        claimed_at = ticket.get('claimed_at')
+        if claimed_at is not None:
+            seconds = max(0.0, claimed_at - created_at)
+            self._add(self.claim_by_type, ticket_type, seconds, weight)
+            self._add(self.claim_by_staff, ticket.get('first_claimed_by'), seconds, weight)
+
+        closed_at = ticket.get('closed_at')
+        if closed_at is not None:
+            seconds = max(0.0, closed_at - created_at)
+            self._add(self.close_by_type, ticket_type, seconds, weight)
+            self._add(self.close_by_staff, ticket.get('closed_by'), seconds, weight)
+
+    def summary(self, histogram: DurationHistogram) -> str:
+        values = " / ".join(format_duration(histogram.percentile(q)) for q in self.PERCENTILES)
+        return f"{values} (n={histogram.count})"
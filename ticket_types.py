@@ -0,0 +1,93 @@
+import json
+import discord
+
+
+class TicketType:
+    def __init__(self, value: str, label: str, title: str, message: str, role_ids, emoji: str = None,
+                 description: str = None, channel_prefix: str = None):
+        self.value = value
+        self.label = label
+        self.title = title
+        self.message = message
+        self.role_ids = tuple(role_ids)
+        self.emoji = emoji
+        self.description = description
+        self.channel_prefix = channel_prefix or value.split('_')[0]
+
+    def select_option(self) -> discord.SelectOption:
+        return discord.SelectOption(label=self.label, value=self.value, description=self.description, emoji=self.emoji)
+
+
+class TicketTypeRegistry:
+    """Ticket-Typen aus einer Konfigurationsdatei, inkl. vorberechneter Select-Optionen und Overwrite-Vorlagen.
+
+    Die Vorlagen werden pro Server einmal aufgelöst; bei Rollenänderungen wird der Cache verworfen.
+    Beim Erstellen eines Tickets wird nur noch die Vorlage kopiert und der Ersteller ergänzt.
+    """
+
+    def __init__(self, types, always_allowed_role_ids=()):
+        self.types = {ticket_type.value: ticket_type for ticket_type in types}
+        self.always_allowed_role_ids = tuple(always_allowed_role_ids)
+        self.select_options = [ticket_type.select_option() for ticket_type in types]
+        self._templates = {}
+
+    @classmethod
+    def load(cls, path: str, role_tiers: dict, always_allowed_role_ids=()):
+        with open(path, encoding='utf-8') as fh:
+            config = json.load(fh)
+
+        types = []
+        for entry in config['types']:
+            # Rollen dürfen als Stufe ("supporter", "mod", "admin") oder direkt als ID angegeben werden
+            role_ids = [role_tiers[role] if isinstance(role, str) else int(role) for role in entry.get('roles', ())]
+            types.append(TicketType(
+                value=entry['value'],
+                label=entry['label'],
+                title=entry['title'],
+                message=entry['message'],
+                role_ids=role_ids,
+                emoji=entry.get('emoji'),
+                description=entry.get('description'),
+                channel_prefix=entry.get('channel_prefix'),
+            ))
+        return cls(types, always_allowed_role_ids)
+
+    def get(self, value: str):
+        return self.types.get(value)
+
+    def label(self, value: str) -> str:
+        ticket_type = self.types.get(value)
+        return ticket_type.label if ticket_type else str(value)
+
+    def invalidate(self, guild_id: int = None):
+        if guild_id is None:
+            self._templates.clear()
+        else:
+            self._templates.pop(guild_id, None)
+
+    def overwrite_template(self, guild: discord.Guild, value: str) -> dict:
+        templates = self._templates.get(guild.id)
+        if templates is None:
+            templates = self._templates[guild.id] = self._build_templates(guild)
+        return templates[value]
+
+    def _build_templates(self, guild: discord.Guild) -> dict:
+        allow = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+        base = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            guild.me: allow,
+        }
+        for role_id in self.always_allowed_role_ids:
+            role = guild.get_role(role_id)
+            if role:
+                base[role] = allow
+
+        templates = {}
+        for value, ticket_type in self.types.items():
+            overwrites = dict(base)
+            for role_id in ticket_type.role_ids:
+                role = guild.get_role(role_id)
+                if role:
+                    overwrites[role] = allow
+            templates[value] = overwrites
+        return templates